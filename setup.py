@@ -21,6 +21,8 @@ setup(
     license='MIT',
     packages=['spotify_web_api'],
     install_requires=['requests', 'pytest'],
+    extras_require={'http2': ['httpx[http2]']},
+    entry_points={'console_scripts': ['spotify-fetch=spotify_web_api.cli:main']},
     include_package_data=True,
     zip_safe=False
 )
\ No newline at end of file
@@ -0,0 +1,216 @@
+"""
+Command line tool for bulk fetching. Reads ids (or names with --names) from a file or stdin, one per line, and writes
+newline delimited json to stdout. Each line is {"input": <id or name>, "data": <result>}.
+
+    spotify-fetch tracks ids.txt > tracks.jsonl
+    cat artists.txt | spotify-fetch artist-albums --names --concurrency 4 --rate 2 > albums.jsonl
+
+Inputs are batched where the api allows it and the batches are fetched concurrently under a shared rate limit.
+With --resume FILE every finished input is written to FILE and skipped on the next run. An input is only marked as
+done after its output is flushed so a crash can repeat at most the batches that were in flight.
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from spotify_web_api.spotify_api import Spotify
+from spotify_web_api.scheduler import Scheduler, priority
+from spotify_web_api.jobs import check
+
+# command -> (type of item for names, max inputs per request)
+COMMANDS = {
+    "tracks": ("track", 50),
+    "audio-features": ("track", 100),
+    "artist-albums": ("artist", 1),
+    "playlist-tracks": ("playlist", 1),
+}
+
+
+def fetch_pages(spy, query_type, payload, path_params, limit):
+    """
+    Get the items from every page of a paged endpoint
+
+    :return: list of items
+    """
+    items = []
+    offset, total = 0, 1
+    while offset < total:
+        page = check(spy.path_query(query_type, {**payload, "limit": limit, "offset": offset}, path_params))
+        items.extend(page.get("items", []))
+        total = page.get("total", 0)
+        offset += limit
+
+    return items
+
+
+def fetch(spy, command, ids):
+    """
+    Fetch the data for one batch of ids. We query directly rather than use the getters so an error response (e.g.
+    a 429) raises instead of looking like an empty result
+
+    :param spy: Spotify object
+    :param command: one of COMMANDS
+    :param ids: list of spotify ids
+
+    :return: list of results, same order as ids
+    """
+    if command == "tracks":
+        return check(spy.query("tracks", {"ids": ",".join(ids), "market": "US"}))["tracks"]
+    if command == "audio-features":
+        return check(spy.query("audio-features", {"ids": ",".join(ids)}))["audio_features"]
+    if command == "artist-albums":
+        payload = {"include_groups": "album,single,appears_on,compilation"}
+        return [fetch_pages(spy, "artists", payload, [ids[0], "albums"], 50)]
+    if command == "playlist-tracks":
+        return [fetch_pages(spy, "playlists", {}, [ids[0], "tracks"], 100)]
+
+
+def resolve(spy, name, search_type):
+    """
+    Get the id for a name
+
+    :return: id or None if nothing was found
+    """
+    items = check(spy.search(name, search_type, limit=1)).get(f"{search_type}s", {}).get("items", [])
+    return items[0]["id"] if items else None
+
+
+def run_batch(spy, command, batch, names):
+    """
+    Resolve the names if needed and fetch a batch
+
+    :return: list of (input, result). The result is None for names that couldn't be found
+    """
+    with priority("bulk"):
+        if not names:
+            return list(zip(batch, fetch(spy, command, batch)))
+
+        search_type = COMMANDS[command][0]
+        ids = {name: resolve(spy, name, search_type) for name in batch}
+        found = [name for name in batch if ids[name] is not None]
+
+        results = dict(zip(found, fetch(spy, command, [ids[name] for name in found]) if found else []))
+        return [(name, results.get(name)) for name in batch]
+
+
+def read_inputs(path):
+    """
+    :param path: file to read or None for stdin
+
+    :return: list of non empty stripped lines
+    """
+    f = open(path) if path is not None else sys.stdin
+    try:
+        return [line.strip() for line in f if line.strip()]
+    finally:
+        if path is not None:
+            f.close()
+
+
+def read_done(path):
+    """
+    :param path: resume file or None
+
+    :return: set of inputs already done
+    """
+    if path is None:
+        return set()
+    try:
+        return set(read_inputs(path))
+    except FileNotFoundError:
+        return set()
+
+
+def positive_int(value):
+    """
+    argparse type for ints of at least 1
+    """
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(prog="spotify-fetch", description="Bulk fetch from the Spotify web api as jsonl")
+    parser.add_argument("command", choices=list(COMMANDS))
+    parser.add_argument("input", nargs="?", help="File with one id or name per line. Defaults to stdin")
+    parser.add_argument("--names", action="store_true", help="Inputs are names to search for instead of ids")
+    parser.add_argument("--concurrency", type=positive_int, default=4, help="Number of batches fetched at the same time")
+    parser.add_argument("--rate", type=float, default=1/3, help="Max requests per second")
+    parser.add_argument("--resume", help="File to record finished inputs in. Inputs already in it are skipped")
+    parser.add_argument("--quiet", action="store_true", help="Don't show progress")
+    return parser.parse_args(args)
+
+
+def main(args=None, spy=None, out=None):
+    """
+    Entry point for spotify-fetch
+
+    :param args: list of arguments. Defaults to sys.argv
+    :param spy: Spotify object to use. Defaults to one built from the ENV credentials and --rate
+    :param out: file to write the jsonl to. Defaults to stdout
+
+    :return: exit code. 1 if any batch failed
+    """
+    args = parse_args(args)
+    out = out if out is not None else sys.stdout
+
+    if spy is None:
+        spy = Spotify(scheduler=Scheduler(rate=args.rate))
+
+    done = read_done(args.resume)
+    inputs = [i for i in dict.fromkeys(read_inputs(args.input)) if i not in done]
+
+    batch_size = COMMANDS[args.command][1]
+    batches = [inputs[i:i + batch_size] for i in range(0, len(inputs), batch_size)]
+
+    resume = open(args.resume, "a") if args.resume is not None else None
+    start = time.time()
+    finished = 0
+    failed = 0
+
+    try:
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            futures = [pool.submit(run_batch, spy, args.command, batch, args.names) for batch in batches]
+
+            for future in as_completed(futures):
+                # Nothing from a failed batch is written or marked as done so it's retried with --resume
+                try:
+                    results = future.result()
+                except Exception as e:
+                    failed += 1
+                    sys.stderr.write(f"\nBatch failed: {e}\n")
+                    continue
+
+                for item, data in results:
+                    out.write(json.dumps({"input": item, "data": data}) + "\n")
+                out.flush()
+
+                if resume is not None:
+                    resume.write("".join(f"{item}\n" for item, _ in results))
+                    resume.flush()
+
+                finished += len(results)
+                if not args.quiet:
+                    elapsed = time.time() - start
+                    sys.stderr.write(f"\r{finished}/{len(inputs)} done - {finished / elapsed:.1f} items/s")
+                    sys.stderr.flush()
+    finally:
+        if resume is not None:
+            resume.close()
+        if not args.quiet:
+            sys.stderr.write("\n")
+
+    if failed:
+        sys.stderr.write(f"{failed} of {len(batches)} batches failed\n")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""
+Persistent on disk cache for query responses.
+
+Responses are zlib compressed and appended to a segment file. Where each one lives is kept in a fixed size hash
+table in a separate index file which is memory mapped. A lookup hashes the key and probes the table in place so the
+index is never loaded into python objects.
+
+Layout of the cache directory:
+    - segment: records of [key length (4 bytes)][key][compressed response]
+    - index: header followed by slots of [key digest (16 bytes)][offset][length][time stored]
+
+Overwriting a key appends a new record and leaves the old one as dead space. Once the segment grows past max_size it's
+compacted, keeping the newest entries that aren't older than max_age. Entries older than max_age are never returned.
+
+Only one process should use a cache directory at a time.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+MAGIC = b"SPCACHE1"
+HEADER = struct.Struct("<8sQQQ")     # magic, capacity, count, end of segment
+SLOT = struct.Struct("<16sQQd")      # digest, offset, length, time stored
+RECORD_KEY = struct.Struct("<I")
+EMPTY = bytes(16)
+
+# Grow the index once this fraction of the slots are used
+MAX_LOAD = .6
+# When compacting keep this fraction of max_size so we don't compact again right away
+COMPACT_TO = .75
+
+
+def digest(key):
+    """
+    :param key: str key
+
+    :return: 16 byte digest of the key
+    """
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+class DiskCache:
+    def __init__(self, path, max_size=512 * 1024 ** 2, max_age=30 * 24 * 3600, min_size=0, capacity=1024, level=6):
+        """
+        :param path: directory the cache is kept in. Created if it doesn't exist
+        :param max_size: max bytes of the segment file before it's compacted
+        :param max_age: seconds an entry is good for. Defaults to 30 days. None never expires
+        :param min_size: only cache responses of at least this many bytes (before compression)
+        :param capacity: initial number of index slots
+        :param level: zlib compression level
+        """
+        self._dir = path
+        self._max_size = max_size
+        self._max_age = max_age
+        self._min_size = min_size
+        self._level = level
+        self._lock = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        self._index_path = os.path.join(path, "index")
+        self._segment_path = os.path.join(path, "segment")
+
+        if not os.path.exists(self._index_path) or not os.path.exists(self._segment_path):
+            self._create(capacity)
+
+        self._open()
+
+    def _create(self, capacity):
+        """
+        Start an empty cache
+        """
+        with open(self._segment_path, "wb"):
+            pass
+        self._write_index(self._index_path, capacity, [], 0)
+
+    @staticmethod
+    def _write_index(path, capacity, entries, segment_end):
+        """
+        Write a new index file holding the entries -> list of (digest, offset, length, time stored)
+        """
+        buf = bytearray(HEADER.size + SLOT.size * capacity)
+        HEADER.pack_into(buf, 0, MAGIC, capacity, len(entries), segment_end)
+
+        for entry in entries:
+            slot = int.from_bytes(entry[0][:8], "little") % capacity
+            while buf[HEADER.size + slot * SLOT.size:HEADER.size + slot * SLOT.size + 16] != EMPTY:
+                slot = (slot + 1) % capacity
+            SLOT.pack_into(buf, HEADER.size + slot * SLOT.size, *entry)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buf)
+        os.replace(tmp_path, path)
+
+    def _open(self):
+        self._index_file = open(self._index_path, "r+b")
+        self._index = mmap.mmap(self._index_file.fileno(), 0)
+        self._segment = open(self._segment_path, "r+b")
+
+        magic, self._capacity, self._count, self._segment_end = HEADER.unpack_from(self._index, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self._dir} isn't a cache directory")
+
+        # Anything past the end recorded in the index was written by a put that never finished
+        self._segment.truncate(self._segment_end)
+
+    def _close(self):
+        self._index.close()
+        self._index_file.close()
+        self._segment.close()
+
+    def close(self):
+        """
+        Flush and close the cache files
+
+        :return: None
+        """
+        with self._lock:
+            self._index.flush()
+            self._close()
+
+    def __len__(self):
+        return self._count
+
+    def _find(self, key_digest):
+        """
+        Probe the index for a key
+
+        :return: (slot number, True if the slot holds the key). If not found the slot is the empty one to use
+        """
+        slot = int.from_bytes(key_digest[:8], "little") % self._capacity
+        while True:
+            pos = HEADER.size + slot * SLOT.size
+            stored = self._index[pos:pos + 16]
+            if stored == key_digest:
+                return slot, True
+            if stored == EMPTY:
+                return slot, False
+            slot = (slot + 1) % self._capacity
+
+    def _entries(self):
+        """
+        All the entries in the index. Only used when resizing or compacting
+        """
+        for slot in range(self._capacity):
+            entry = SLOT.unpack_from(self._index, HEADER.size + slot * SLOT.size)
+            if entry[0] != EMPTY:
+                yield entry
+
+    def _expired(self, stored_at):
+        return self._max_age is not None and time.time() - stored_at > self._max_age
+
+    def get(self, key):
+        """
+        Get a cached response
+
+        :param key: str key
+
+        :return: response bytes or None
+        """
+        key_bytes = key.encode("utf-8")
+
+        with self._lock:
+            slot, found = self._find(digest(key))
+            if not found:
+                return None
+
+            _, offset, length, stored_at = SLOT.unpack_from(self._index, HEADER.size + slot * SLOT.size)
+            if self._expired(stored_at):
+                return None
+
+            self._segment.seek(offset)
+            record = self._segment.read(length)
+
+        key_len, = RECORD_KEY.unpack_from(record, 0)
+        if record[RECORD_KEY.size:RECORD_KEY.size + key_len] != key_bytes:
+            return None
+
+        return zlib.decompress(record[RECORD_KEY.size + key_len:])
+
+    def put(self, key, content):
+        """
+        Cache a response
+
+        :param key: str key
+        :param content: response bytes
+
+        :return: None
+        """
+        if len(content) < self._min_size:
+            return
+
+        key_bytes = key.encode("utf-8")
+        record = RECORD_KEY.pack(len(key_bytes)) + key_bytes + zlib.compress(content, self._level)
+        key_digest = digest(key)
+
+        with self._lock:
+            if (self._count + 1) / self._capacity > MAX_LOAD:
+                self._rebuild(list(self._entries()), self._capacity * 2)
+
+            offset = self._segment_end
+            self._segment.seek(offset)
+            self._segment.write(record)
+            self._segment.flush()
+
+            slot, found = self._find(key_digest)
+            SLOT.pack_into(self._index, HEADER.size + slot * SLOT.size, key_digest, offset, len(record), time.time())
+
+            self._segment_end += len(record)
+            self._count += 0 if found else 1
+            HEADER.pack_into(self._index, 0, MAGIC, self._capacity, self._count, self._segment_end)
+
+            if self._segment_end > self._max_size:
+                self._compact()
+
+    def _rebuild(self, entries, capacity):
+        """
+        Write a new index for the entries with the given capacity. The segment is left alone
+        """
+        self._close()
+        self._write_index(self._index_path, capacity, entries, self._segment_end)
+        self._open()
+
+    def _compact(self):
+        """
+        Rewrite the segment with only the newest entries that haven't expired and fit in the size budget
+        """
+        budget = self._max_size * COMPACT_TO
+        entries = sorted((e for e in self._entries() if not self._expired(e[3])), key=lambda e: e[3], reverse=True)
+
+        kept = []
+        size = 0
+        tmp_path = f"{self._segment_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            for key_digest, offset, length, stored_at in entries:
+                if size + length > budget:
+                    break
+                self._segment.seek(offset)
+                f.write(self._segment.read(length))
+                kept.append((key_digest, size, length, stored_at))
+                size += length
+
+        capacity = self._capacity
+        while len(kept) / capacity > MAX_LOAD:
+            capacity *= 2
+
+        self._close()
+        os.replace(tmp_path, self._segment_path)
+        self._segment_end = size
+        self._write_index(self._index_path, capacity, kept, size)
+        self._open()
+
+    def clear(self):
+        """
+        Remove everything from the cache
+
+        :return: None
+        """
+        with self._lock:
+            self._close()
+            self._create(self._capacity)
+            self._open()
+
+    def stats(self):
+        """
+        :return: dict with the number of entries, index capacity and segment size in bytes
+        """
+        with self._lock:
+            return {"entries": self._count, "capacity": self._capacity, "segment_bytes": self._segment_end}
@@ -0,0 +1,248 @@
+"""
+Checkpointed long running jobs.
+
+A job is split into chunks (a page of a playlist, a batch of 100 ids, ...). The result of each chunk is saved to a
+sqlite file as soon as it's fetched so if the job crashes or gets throttled, running it again with the same store only
+fetches the chunks that are missing. A chunk is saved in a single transaction and saving the same chunk twice is
+ignored so nothing gets written twice.
+
+    store = JobStore("jobs.db")
+    tracks = jobs.playlist_tracks(spy, store, "37i9dQZF1DXcBWIGoYBM5M")
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+
+
+class JobStore:
+    def __init__(self, path=":memory:"):
+        """
+        :param path: sqlite file to keep progress in
+        """
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS jobs (name TEXT PRIMARY KEY, meta TEXT, done INTEGER)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS chunks "
+                               "(job TEXT, chunk TEXT, result TEXT, PRIMARY KEY (job, chunk))")
+
+    def close(self):
+        """
+        Close the sqlite connection
+
+        :return: None
+        """
+        with self._lock:
+            self._conn.close()
+
+    def get_meta(self, job):
+        """
+        :param job: name of job
+
+        :return: dict of info stored for the job or None if it hasn't been started
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT meta FROM jobs WHERE name = ?", (job,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set_meta(self, job, meta):
+        """
+        Store info needed to resume the job. e.g. the total number of items
+
+        :param job: name of job
+        :param meta: dict of info
+
+        :return: None
+        """
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO jobs (name, meta, done) VALUES (?, ?, 0) "
+                               "ON CONFLICT (name) DO UPDATE SET meta = excluded.meta", (job, json.dumps(meta)))
+
+    def is_done(self, job):
+        """
+        :param job: name of job
+
+        :return: True if every chunk of the job was fetched
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT done FROM jobs WHERE name = ?", (job,)).fetchone()
+        return bool(row and row[0])
+
+    def finish(self, job):
+        """
+        Mark every chunk of the job as fetched
+
+        :param job: name of job
+
+        :return: None
+        """
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO jobs (name, meta, done) VALUES (?, '{}', 1) "
+                               "ON CONFLICT (name) DO UPDATE SET done = 1", (job,))
+
+    def completed(self, job):
+        """
+        :param job: name of job
+
+        :return: dict of chunk -> result for the chunks already fetched
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT chunk, result FROM chunks WHERE job = ?", (job,)).fetchall()
+        return {chunk: json.loads(result) for chunk, result in rows}
+
+    def save(self, job, chunk, result):
+        """
+        Save the result of a chunk. Does nothing if it was already saved
+
+        :param job: name of job
+        :param chunk: key of chunk
+        :param result: json serializable result
+
+        :return: None
+        """
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO chunks (job, chunk, result) VALUES (?, ?, ?)",
+                               (job, str(chunk), json.dumps(result)))
+
+    def clear(self, job):
+        """
+        Forget everything about a job so it runs from the start next time
+
+        :param job: name of job
+
+        :return: None
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks WHERE job = ?", (job,))
+            self._conn.execute("DELETE FROM jobs WHERE name = ?", (job,))
+
+
+def check(response):
+    """
+    Raise if the api returned an error (e.g. when throttled) so the chunk isn't saved as done
+
+    :param response: response json
+
+    :return: response json
+    """
+    if "error" in response:
+        raise RuntimeError(f"Spotify returned an error: {response['error']}")
+    return response
+
+
+def run_chunks(store, job, chunks, fetch):
+    """
+    Fetch each chunk that isn't already in the store
+
+    :param store: JobStore
+    :param job: name of job
+    :param chunks: list of chunk keys
+    :param fetch: function taking a chunk key and returning its json serializable result
+
+    :return: list of results in the same order as chunks
+    """
+    done = store.completed(job)
+
+    for chunk in chunks:
+        if str(chunk) not in done:
+            done[str(chunk)] = fetch(chunk)
+            store.save(job, chunk, done[str(chunk)])
+
+    store.finish(job)
+    return [done[str(chunk)] for chunk in chunks]
+
+
+def run_pages(store, job, fetch_page, limit, version=None):
+    """
+    Walk a paged endpoint. The first page tells us the total so we know the offsets of the rest
+
+    :param store: JobStore
+    :param job: name of job
+    :param fetch_page: function taking an offset and returning a paging object
+    :param limit: number of items per page
+    :param version: version of the data being paged through. If it's not the one the job was started with the saved
+    pages are thrown away and the job starts over
+
+    :return: list of items over all the pages
+    """
+    meta = store.get_meta(job)
+    if meta is not None and meta.get("version") != version:
+        store.clear(job)
+        meta = None
+
+    if meta is None:
+        first = fetch_page(0)
+        meta = {"total": first.get("total", 0), "version": version}
+        store.set_meta(job, meta)
+        store.save(job, 0, first.get("items", []))
+
+    pages = run_chunks(store, job, range(0, meta["total"], limit), lambda offset: fetch_page(offset).get("items", []))
+    return [item for page in pages for item in page]
+
+
+def playlist_tracks(spy, store, playlist_id):
+    """
+    Get all the tracks in a playlist, 100 at a time. The playlist's snapshot id is checked first so a playlist that
+    changed since the job was saved is fetched again
+
+    :param spy: Spotify object
+    :param store: JobStore
+    :param playlist_id: spotify id for playlist
+
+    :return: list of tracks (each is a dict)
+    """
+    limit = 100
+    path_params = [playlist_id, "tracks"]
+
+    def fetch_page(offset):
+        return check(spy.path_query("playlists", {"offset": offset, "limit": limit}, path_params))
+
+    snapshot_id = check(spy.path_query("playlists", {"fields": "snapshot_id"}, [playlist_id])).get("snapshot_id")
+    return run_pages(store, f"playlist-tracks:{playlist_id}", fetch_page, limit, version=snapshot_id)
+
+
+def artist_albums(spy, store, artist_id, include_groups=None):
+    """
+    Get all the albums for an artist, 50 at a time
+
+    :param spy: Spotify object
+    :param store: JobStore
+    :param artist_id: spotify id for artist
+    :param include_groups: list or None for all groups
+
+    :return: list of album objects
+    """
+    limit = 50
+    include_groups = ",".join(include_groups or ['album', 'single', 'appears_on', 'compilation'])
+    path_params = [artist_id, "albums"]
+
+    def fetch_page(offset):
+        payload = {"include_groups": include_groups, "limit": limit, "offset": offset}
+        return check(spy.path_query("artists", payload, path_params))
+
+    return run_pages(store, f"artist-albums:{artist_id}:{include_groups}", fetch_page, limit)
+
+
+def audio_features(spy, store, track_ids, name=None):
+    """
+    Get the audio features for any number of tracks, 100 at a time
+
+    :param spy: Spotify object
+    :param store: JobStore
+    :param track_ids: list of spotify ids for tracks
+    :param name: name of job. Defaults to one built from a hash of the ids
+
+    :return: list of audio features
+    """
+    limit = 100
+    if name is None:
+        name = "audio-features:" + hashlib.sha1(",".join(track_ids).encode("utf-8")).hexdigest()
+
+    def fetch(offset):
+        ids = track_ids[offset:offset + limit]
+        return check(spy.query("audio-features", {"ids": ",".join(ids)})).get("audio_features", [])
+
+    batches = run_chunks(store, name, range(0, len(track_ids), limit), fetch)
+    return [features for batch in batches for features in batch]
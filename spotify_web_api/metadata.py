@@ -0,0 +1,156 @@
+"""
+Registry of the category ids and genre seeds used to validate input.
+
+The full list of categories (every page) and the genre seeds are fetched the first time they're needed and kept for
+ttl seconds. If a list can't be fetched nothing is rejected and it's only tried again after retry seconds. By default
+one registry is shared by every Spotify object in the process. If a path is given the lists are also saved to a json
+file so a new process can use them without making any calls while they're still fresh.
+"""
+
+import json
+import os
+import threading
+import time
+
+
+class MetadataRegistry:
+    def __init__(self, path=None, ttl=24 * 3600, retry=5 * 60):
+        """
+        :param path: json file to save the lists in. None keeps them in memory only
+        :param ttl: seconds before the lists are fetched again
+        :param retry: seconds before a list that couldn't be fetched is tried again
+        """
+        self._path = path
+        self._ttl = ttl
+        self._retry = retry
+        self._lock = threading.Lock()
+
+        # name -> (time fetched, set of ids)
+        self._entries = {}
+        # name -> time the last fetch failed. Only kept in memory
+        self._failed = {}
+        # name -> lock held while the list is fetched so different lists can be fetched at the same time
+        self._fetch_locks = {}
+
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self._entries = {name: (e["fetched_at"], set(e["ids"])) for name, e in json.load(f).items()}
+
+    def _get(self, name, fetch):
+        """
+        Get the ids for a list, fetching it if we don't have a fresh copy
+
+        :param name: name of the list
+        :param fetch: function that returns the ids
+
+        :return: set of ids
+        """
+        with self._lock:
+            ids = self._fresh(name)
+            if ids is not None:
+                return ids
+            fetch_lock = self._fetch_locks.setdefault(name, threading.Lock())
+
+        with fetch_lock:
+            # Someone else may have fetched it while we were waiting
+            with self._lock:
+                ids = self._fresh(name)
+                if ids is not None:
+                    return ids
+
+            # A list that errored part of the way through is treated like one that couldn't be fetched at all
+            try:
+                ids = set(fetch())
+            except RuntimeError:
+                ids = set()
+
+            # Don't keep an empty list around. It most likely means the request failed. We remember that it failed
+            # for a while though so every call that needs the list doesn't send another request for it first
+            with self._lock:
+                if ids:
+                    self._failed.pop(name, None)
+                    self._entries[name] = (time.time(), ids)
+                    self._save()
+                else:
+                    self._failed[name] = time.time()
+
+            return ids
+
+    def _fresh(self, name):
+        """
+        Get the ids for a list if we don't need to fetch it. Must be called holding the lock
+
+        :return: set of ids (empty if the last fetch failed not long ago) or None if it needs to be fetched
+        """
+        entry = self._entries.get(name)
+        if entry is not None and time.time() - entry[0] < self._ttl:
+            return entry[1]
+
+        failed_at = self._failed.get(name)
+        if failed_at is not None and time.time() - failed_at < self._retry:
+            return set()
+
+        return None
+
+    def _save(self):
+        if self._path is None:
+            return
+
+        entries = {name: {"fetched_at": fetched_at, "ids": sorted(ids)} for name, (fetched_at, ids) in
+                   self._entries.items()}
+
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self._path)
+
+    def category_ids(self, spy, country="US"):
+        """
+        :param spy: Spotify object used if the list needs to be fetched
+        :param country: Country the categories are for. None for the categories of every country
+
+        :return: set of category ids
+        """
+        name = f"categories:{country}" if country is not None else "categories"
+        return self._get(name, lambda: [c['id'] for c in spy.get_all_categories(country=country)])
+
+    def genre_seeds(self, spy):
+        """
+        :param spy: Spotify object used if the list needs to be fetched
+
+        :return: set of genres
+        """
+        return self._get("genres", spy.get_genre_seeds)
+
+    def is_category(self, spy, category, country="US"):
+        """
+        If the category is a valid id. If the list couldn't be fetched we can't tell so we say it is
+
+        :return: bool
+        """
+        ids = self.category_ids(spy, country)
+        return not ids or category in ids
+
+    def is_genre(self, spy, genre):
+        """
+        If the genre is a valid seed. If the list couldn't be fetched we can't tell so we say it is
+
+        :return: bool
+        """
+        genres = self.genre_seeds(spy)
+        return not genres or genre in genres
+
+    def clear(self):
+        """
+        Forget the lists so they're fetched again
+
+        :return: None
+        """
+        with self._lock:
+            self._entries = {}
+            self._failed = {}
+            self._save()
+
+
+# Shared by every Spotify object that isn't given its own
+REGISTRY = MetadataRegistry()
@@ -0,0 +1,239 @@
+"""
+Compact typed objects for api results.
+
+Each model uses __slots__ and only keeps the fields listed for it. Everything else in the response (e.g. the
+available_markets list on every track and album) is dropped. Scalar fields are copied when the object is built.
+Nested objects like a track's album or an album's images are kept as the raw json and only turned into models the
+first time they're accessed.
+
+The models are opt in. Either parse a result yourself:
+
+    tracks = Track.parse(spy.get_tracks(track_ids, track_id=True))
+
+or wrap the client so every getter returns models:
+
+    typed_spy = typed(spy)
+    typed_spy.get_playlist_tracks(playlist_id)[0].track.album.name
+"""
+
+import functools
+
+
+class Lazy:
+    """
+    Nested field that's decoded into a model the first time it's accessed. Lists are decoded into tuples so we can
+    tell if it's been done yet.
+    """
+    def __init__(self, model, many=False):
+        self.model = model
+        self.many = many
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.slot = f"_{name}"
+
+    def decode(self, raw):
+        model = self.model() if not isinstance(self.model, type) else self.model
+        if self.many:
+            return tuple(model(r) if r is not None else None for r in raw)
+        return model(raw)
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+
+        value = getattr(obj, self.slot)
+        if value is None or isinstance(value, (Model, tuple)):
+            return value
+
+        value = self.decode(value)
+        setattr(obj, self.slot, value)
+        return value
+
+    def to_json(self, obj):
+        """
+        Value for to_dict. Raw json that was never decoded is decoded for this without being stored so the result only
+        has the kept fields either way and the field stays lazy
+        """
+        value = getattr(obj, self.slot)
+        if value is not None and not isinstance(value, (Model, tuple)):
+            value = self.decode(value)
+        if isinstance(value, Model):
+            return value.to_dict()
+        if isinstance(value, tuple):
+            return [v.to_dict() if v is not None else None for v in value]
+        return value
+
+
+class ModelMeta(type):
+    """
+    Builds __slots__ from the FIELDS and Lazy attributes of each model. Subclasses only add slots for what they define
+    """
+    def __new__(mcs, name, bases, namespace):
+        fields = namespace.get("FIELDS", ())
+        lazy = tuple(k for k, v in namespace.items() if isinstance(v, Lazy))
+        namespace["__slots__"] = tuple(fields) + tuple(f"_{k}" for k in lazy)
+        namespace["_lazy"] = sum((getattr(b, "_lazy", ()) for b in bases), ()) + lazy
+        return super().__new__(mcs, name, bases, namespace)
+
+
+class Model(metaclass=ModelMeta):
+    FIELDS = ()
+
+    def __init__(self, data):
+        get = data.get
+        for field in self.FIELDS:
+            setattr(self, field, get(field))
+        for name in self._lazy:
+            setattr(self, f"_{name}", get(name))
+
+    @classmethod
+    def parse(cls, data):
+        """
+        Build models from a result
+
+        :param data: dict, list of dicts or None
+
+        :return: model, list of models or None
+        """
+        if data is None:
+            return None
+        if isinstance(data, list):
+            return [cls(d) if d is not None else None for d in data]
+        return cls(data)
+
+    def to_dict(self):
+        """
+        :return: dict with the kept fields in the same shape as the api response
+        """
+        d = {field: getattr(self, field) for field in self.FIELDS}
+        for name in self._lazy:
+            d[name] = getattr(type(self), name).to_json(self)
+        return d
+
+    def __repr__(self):
+        name = getattr(self, "name", None) if "name" in self.FIELDS else None
+        key = getattr(self, "id", None) if "id" in self.FIELDS else None
+        return f"{type(self).__name__}(id={key!r}, name={name!r})"
+
+
+class Image(Model):
+    FIELDS = ("url", "height", "width")
+
+
+class Artist(Model):
+    FIELDS = ("id", "name", "uri", "popularity", "genres", "followers")
+    images = Lazy(Image, many=True)
+
+
+class Track(Model):
+    FIELDS = ("id", "name", "uri", "duration_ms", "explicit", "popularity", "track_number", "disc_number",
+              "preview_url", "is_local", "external_ids")
+    album = Lazy(lambda: Album)
+    artists = Lazy(Artist, many=True)
+
+
+class Page(Model):
+    """
+    Paging object. Subclasses set the model for the items
+    """
+    FIELDS = ("href", "total", "limit", "offset", "next", "previous")
+
+
+class TrackPage(Page):
+    items = Lazy(Track, many=True)
+
+
+class Album(Model):
+    FIELDS = ("id", "name", "uri", "album_type", "release_date", "release_date_precision", "total_tracks", "label",
+              "popularity", "genres")
+    artists = Lazy(Artist, many=True)
+    images = Lazy(Image, many=True)
+    tracks = Lazy(TrackPage)
+
+
+class AlbumPage(Page):
+    items = Lazy(Album, many=True)
+
+
+class PlaylistTrack(Model):
+    FIELDS = ("added_at", "is_local")
+    track = Lazy(Track)
+
+
+class PlaylistTrackPage(Page):
+    items = Lazy(PlaylistTrack, many=True)
+
+
+class Playlist(Model):
+    FIELDS = ("id", "name", "uri", "description", "public", "collaborative", "snapshot_id", "owner", "followers")
+    images = Lazy(Image, many=True)
+    tracks = Lazy(PlaylistTrackPage)
+
+
+class AudioFeatures(Model):
+    FIELDS = ("id", "uri", "danceability", "energy", "key", "loudness", "mode", "speechiness", "acousticness",
+              "instrumentalness", "liveness", "valence", "tempo", "duration_ms", "time_signature")
+
+
+# Model each getter returns
+RETURNS = {
+    "get_artists": Artist,
+    "get_related_artists": Artist,
+    "get_artist_albums": Album,
+    "get_top_tracks": Track,
+    "get_albums": Album,
+    "get_album_tracks": Track,
+    "get_tracks": Track,
+    "get_recommendations": Track,
+    "get_audio_features": AudioFeatures,
+    "get_new_releases": AlbumPage,
+    "get_featured_playlists": Playlist,
+    "get_category_playlists": Playlist,
+    "get_playlist": Playlist,
+    "get_playlist_tracks": PlaylistTrack,
+}
+
+SEARCH_MODELS = {"artist": Artist, "album": Album, "playlist": Playlist, "track": Track}
+
+
+def typed(spy):
+    """
+    Wrap a Spotify object so the getters return models
+
+    :param spy: Spotify object
+
+    :return: TypedSpotify
+    """
+    return TypedSpotify(spy)
+
+
+class TypedSpotify:
+    """
+    Spotify object where the getters return models. Anything else is passed through untouched
+    """
+    __slots__ = ("_spy",)
+
+    def __init__(self, spy):
+        self._spy = spy
+
+    def __getattr__(self, name):
+        attr = getattr(self._spy, name)
+
+        if name in RETURNS:
+            model = RETURNS[name]
+
+            @functools.wraps(attr)
+            def getter(*args, **kwargs):
+                return model.parse(attr(*args, **kwargs))
+
+            return getter
+
+        if name == "batch_search":
+            @functools.wraps(attr)
+            def batch_search(*args, **kwargs):
+                return {t: SEARCH_MODELS[t].parse(items) for t, items in attr(*args, **kwargs).items()}
+
+            return batch_search
+
+        return attr
@@ -0,0 +1,114 @@
+"""
+Local store used for incrementally syncing playlists.
+
+For each playlist we keep the last seen snapshot_id and the ids of the tracks in it. Spotify changes the
+snapshot_id whenever the playlist is modified so if it hasn't changed we don't need to pull the tracks again.
+"""
+
+import json
+import os
+from collections import Counter
+
+
+def track_key(item):
+    """
+    Get the key used to identify a playlist track. Local tracks don't have an id so we fall back to the uri.
+
+    :param item: playlist track object
+
+    :return: id, uri or None
+    """
+    track = item.get("track") or {}
+    return track.get("id") or track.get("uri")
+
+
+def diff_tracks(old_keys, new_items):
+    """
+    Find which tracks were added and removed between two versions of a playlist.
+
+    Duplicates are counted so adding a track that's already there a 2nd time shows up as an addition.
+
+    :param old_keys: track keys from the last sync
+    :param new_items: current playlist track objects
+
+    :return: (added, removed) -> list of added track objects, list of removed track keys
+    """
+    remaining = Counter(old_keys)
+
+    added = []
+    for item in new_items:
+        key = track_key(item)
+        if remaining[key] > 0:
+            remaining[key] -= 1
+        else:
+            added.append(item)
+
+    removed = list(remaining.elements())
+
+    return added, removed
+
+
+class PlaylistStore:
+    """
+    Holds the last synced state of each playlist. If a path is given the state is saved to and loaded from a json file.
+    """
+    def __init__(self, path=None):
+        self._path = path
+        self._playlists = {}
+
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self._playlists = json.load(f)
+
+    def __contains__(self, playlist_id):
+        return playlist_id in self._playlists
+
+    def __len__(self):
+        return len(self._playlists)
+
+    def get(self, playlist_id):
+        """
+        Get the stored state for a playlist
+
+        :param playlist_id: spotify id for playlist
+
+        :return: dict with 'snapshot_id' and 'tracks' or None
+        """
+        return self._playlists.get(playlist_id)
+
+    def put(self, playlist_id, snapshot_id, track_keys):
+        """
+        Store the state of a playlist
+
+        :param playlist_id: spotify id for playlist
+        :param snapshot_id: snapshot_id of the version stored
+        :param track_keys: list of track keys in the playlist
+
+        :return: None
+        """
+        self._playlists[playlist_id] = {"snapshot_id": snapshot_id, "tracks": list(track_keys)}
+
+    def remove(self, playlist_id):
+        """
+        Stop tracking a playlist
+
+        :param playlist_id: spotify id for playlist
+
+        :return: None
+        """
+        self._playlists.pop(playlist_id, None)
+
+    def save(self):
+        """
+        Write the store to disk. We write to a temp file first so a crash never leaves a half written store.
+
+        :return: None
+        """
+        if self._path is None:
+            return
+
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._playlists, f)
+
+        os.replace(tmp_path, self._path)
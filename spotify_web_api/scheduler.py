@@ -0,0 +1,138 @@
+"""
+Priority aware scheduler for requests.
+
+All requests share one rate budget. Waiting requests are put in a queue for their priority class and when a slot in
+the budget opens up it goes to the class picked by weighted fair queuing. Higher priority classes get more of the
+budget but every class with work waiting keeps getting a share so bulk jobs can't be starved.
+
+The priority of a request is taken from the current context:
+
+    with priority("bulk"):
+        spy.get_playlist_tracks(playlist_id)
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Share of the rate budget each class gets when all have requests waiting
+DEFAULT_WEIGHTS = {"interactive": 8, "normal": 4, "bulk": 1}
+
+_priority = contextvars.ContextVar("priority", default="normal")
+
+
+@contextmanager
+def priority(name):
+    """
+    Run requests made inside the block with the given priority class
+
+    :param name: priority class - e.g. 'interactive', 'normal', 'bulk'
+
+    :return: None
+    """
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    """
+    :return: priority class of the current context
+    """
+    return _priority.get()
+
+
+class _Class:
+    def __init__(self, weight):
+        self.weight = weight
+        self.queue = deque()
+        self.vtime = 0
+        self.granted = 0
+        self.total_wait = 0
+        self.max_wait = 0
+
+
+class Scheduler:
+    def __init__(self, rate=1/3, weights=None):
+        """
+        :param rate: Max requests per second over all classes
+        :param weights: dict of class -> weight. Defaults to DEFAULT_WEIGHTS
+        """
+        if rate <= 0:
+            raise ValueError("The rate must be greater than 0")
+
+        self._interval = 1 / rate
+        self._classes = {name: _Class(weight) for name, weight in (weights or DEFAULT_WEIGHTS).items()}
+        self._cond = threading.Condition()
+        self._next_slot = 0
+        self._vtime = 0
+
+    def _pick(self):
+        """
+        Class with waiting requests that has the smallest virtual time
+        """
+        waiting = [c for c in self._classes.values() if c.queue]
+        return min(waiting, key=lambda c: c.vtime) if waiting else None
+
+    def acquire(self, name=None):
+        """
+        Block until a request of the given class is allowed to go
+
+        :param name: priority class. If None the one from the current context is used
+
+        :return: seconds spent waiting
+        """
+        name = name if name is not None else current_priority()
+        if name not in self._classes:
+            raise ValueError(f"{name} is not one of the priority classes - {list(self._classes)}")
+
+        cls = self._classes[name]
+        ticket = object()
+        start = time.monotonic()
+
+        with self._cond:
+            # A class that was idle starts at the current virtual time so it can't bank up credit
+            if not cls.queue:
+                cls.vtime = max(cls.vtime, self._vtime)
+            cls.queue.append(ticket)
+
+            while True:
+                now = time.monotonic()
+                if self._pick() is cls and cls.queue[0] is ticket and now >= self._next_slot:
+                    break
+                self._cond.wait(max(self._next_slot - now, 0) or None)
+
+            cls.queue.popleft()
+            self._vtime = cls.vtime
+            cls.vtime += 1 / cls.weight
+            self._next_slot = max(now, self._next_slot) + self._interval
+
+            waited = now - start
+            cls.granted += 1
+            cls.total_wait += waited
+            cls.max_wait = max(cls.max_wait, waited)
+
+            self._cond.notify_all()
+
+        return waited
+
+    def stats(self):
+        """
+        Queue depth and wait times for each class
+
+        :return: dict of class -> {'queued', 'granted', 'avg_wait', 'max_wait'}
+        """
+        with self._cond:
+            return {
+                name: {
+                    "queued": len(c.queue),
+                    "granted": c.granted,
+                    "avg_wait": c.total_wait / c.granted if c.granted else 0,
+                    "max_wait": c.max_wait,
+                }
+                for name, c in self._classes.items()
+            }
@@ -0,0 +1,142 @@
+"""
+Single-flight deduplication of identical in-flight calls.
+
+When a call for a key is already running, later callers for the same key wait for its result instead of making the
+call again. Threads and coroutines share the same flights so a coroutine can wait on a call started by a thread
+and vice versa. Once a call finishes it's forgotten, so this isn't a cache.
+"""
+
+import asyncio
+import threading
+
+
+def make_key(query_type, payload):
+    """
+    Build a hashable key for a query. Params are sorted and stringified so {'a': 1, 'b': 2} and {'b': '2', 'a': '1'}
+    are the same request.
+
+    :param query_type: Query to make
+    :param payload: Associated parameters
+
+    :return: tuple
+    """
+    return query_type, tuple(sorted((k, str(v)) for k, v in (payload or {}).items()))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = []
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def in_flight(self):
+        """
+        :return: number of calls currently running
+        """
+        with self._lock:
+            return len(self._calls)
+
+    def _join(self, key):
+        """
+        Get the call for the key, creating it if none is running.
+
+        :return: (call, True if the caller is the one that has to make the call)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+
+            call = self._calls[key] = _Call()
+            return call, True
+
+    def _finish(self, key, call, result=None, error=None):
+        with self._lock:
+            call.result, call.error = result, error
+            del self._calls[key]
+            call.done.set()
+            waiters = call.waiters
+
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future, result, error)
+
+    def do(self, key, fn):
+        """
+        Run fn unless a call for key is already running, in which case wait for it and return its result.
+
+        Every caller gets the same result object back so fn should return something immutable, e.g. the raw bytes
+        of a response, and let each caller decode its own copy.
+
+        :param key: hashable key identifying the call
+        :param fn: function with no arguments
+
+        :return: result of fn
+        """
+        call, leader = self._join(key)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, call, error=e)
+            raise
+
+        self._finish(key, call, result=result)
+        return result
+
+    async def do_async(self, key, fn):
+        """
+        Same as do but for coroutines. fn is a blocking function and is run in the default executor so the event loop
+        isn't blocked.
+
+        :param key: hashable key identifying the call
+        :param fn: function with no arguments
+
+        :return: result of fn
+        """
+        call, leader = self._join(key)
+
+        if not leader:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            with self._lock:
+                if not call.done.is_set():
+                    call.waiters.append((loop, future))
+                else:
+                    _resolve(future, call.result, call.error)
+            return await future
+
+        # The call is finished from the executor thread once fn returns. If the leader is cancelled fn keeps running
+        # (shield stops the cancel reaching it) and the other callers still get its result rather than the cancel
+        def run():
+            try:
+                result = fn()
+            except BaseException as e:
+                self._finish(key, call, error=e)
+                raise
+
+            self._finish(key, call, result=result)
+            return result
+
+        return await asyncio.shield(asyncio.get_running_loop().run_in_executor(None, run))
+
+
+def _resolve(future, result, error):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
@@ -24,18 +24,37 @@ import json
 import base64
 import os
 import time
-import requests
+import asyncio
+import contextvars
+import threading
 from math import ceil
 from datetime import datetime
 import itertools
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from spotify_web_api.playlist_sync import PlaylistStore, diff_tracks, track_key
+from spotify_web_api.transport import RequestsTransport
+from spotify_web_api.singleflight import SingleFlight, make_key
+from spotify_web_api.tracing import NULL_SPAN, traced
+from spotify_web_api.metadata import REGISTRY
+from spotify_web_api.scheduler import Scheduler
 
 TOKEN_URL = "https://accounts.spotify.com/api/token"
 ACCESS_URL = "https://api.spotify.com/v1/me"
 BASE_URL = "https://api.spotify.com/v1/"
 
-# All possible Category IDs
-CAT_IDS = ['toplists', 'pop', 'hiphop', 'mood', 'workout', 'decades', 'country', 'focus', 'latin', 'chill', 'edm_dance',
-           'rnb', 'rock', 'indie_alt', 'roots', 'party', 'sleep', 'classical', 'jazz', 'inspirational']
+# Types of items that can be searched for
+SEARCH_TYPES = ['artist', 'album', 'playlist', 'track']
+
+
+# Endpoints whose responses don't change. Only these are kept in the cache unless a query asks for it
+CACHE_ENDPOINTS = ['audio-analysis', 'audio-features', 'tracks', 'albums', 'artists']
+
+# Methods that take a single country and can be fanned out over several
+MARKET_METHODS = ['get_top_tracks', 'get_new_releases', 'get_featured_playlists', 'get_category_playlists']
+
+# Scheduler pacing the threads of a market fan-out when the Spotify object doesn't have one
+_fan_out_scheduler = contextvars.ContextVar("fan_out_scheduler", default=None)
 
 
 def grouper(n, iterable, padvalue=None):
@@ -45,8 +64,43 @@ def grouper(n, iterable, padvalue=None):
     return itertools.zip_longest(*[iter(iterable)]*n, fillvalue=padvalue)
 
 
+def availability_matrix(results):
+    """
+    Dedupe the items returned for several markets and find which markets each one shows up in
+
+    :param results: dict of market -> list of objects or paging object
+
+    :return: dict with 'items' -> {id: object} and 'markets' -> {id: sorted list of markets}
+    """
+    items = {}
+    markets = {}
+    for market, result in results.items():
+        if isinstance(result, dict):
+            result = result.get("items", [])
+
+        for item in result or []:
+            if item is None or item.get("id") is None:
+                continue
+            items.setdefault(item["id"], item)
+            markets.setdefault(item["id"], []).append(market)
+
+    return {"items": items, "markets": {key: sorted(found) for key, found in markets.items()}}
+
+
 class Spotify:
-    def __init__(self, client_id=None, client_secret=None):
+    def __init__(self, client_id=None, client_secret=None, transport=None, query_delay=3, dedupe=True,
+                 scheduler=None, cache=None, tracer=None, metadata=None):
+        """
+        :param client_id: Spotify client id. If None we take it from the SPOTIFY_ID ENV variable
+        :param client_secret: Spotify client secret. If None we take it from the SPOTIFY_SECRET ENV variable
+        :param transport: Transport used to send every request. Defaults to a RequestsTransport
+        :param query_delay: Seconds to wait after each query
+        :param dedupe: If identical queries running at the same time should share one request
+        :param scheduler: Scheduler that paces requests by priority class. When given it replaces query_delay
+        :param cache: DiskCache to keep successful responses in across runs. Only used for CACHE_ENDPOINTS by default
+        :param tracer: Tracer to record how long each call and each part of a query takes
+        :param metadata: MetadataRegistry holding the category ids and genre seeds. Defaults to one shared by the process
+        """
         self._client_id = client_id
         self._client_secret = client_secret
 
@@ -58,11 +112,22 @@ class Spotify:
             if self._client_id is None:
                 raise Exception("The SPOTIFY_ID or SPOTIFY_SECRET ENV variable don't exist")
 
+        self._transport = transport if transport is not None else RequestsTransport()
+        self._query_delay = query_delay
+        self._singleflight = SingleFlight() if dedupe else None
+        self._scheduler = scheduler
+        self._cache = cache
+        self._tracer = tracer
+        self._metadata = metadata if metadata is not None else REGISTRY
+
+        self._token_lock = threading.Lock()
+
         self._access_token = {}
         self._token_start_time = None
         self.get_access_token()
 
 
+    @traced
     def get_access_token(self):
         """
         Get the refresh token and use to exchange or exchange the authorization code for a token
@@ -80,7 +145,7 @@ class Spotify:
         self._token_start_time = time.time()
 
         headers = {"Authorization": "Basic {}".format(b64_auth_str)}
-        post_request = requests.post(TOKEN_URL, data=post_data, headers=headers)
+        post_request = self._transport.post(TOKEN_URL, data=post_data, headers=headers)
 
         self._access_token = json.loads(post_request.text)
 
@@ -94,41 +159,175 @@ class Spotify:
         return time.time() - self._token_start_time >= self._access_token['expires_in']
 
 
-    def query(self, query_type, payload):
+    @traced
+    def query(self, query_type, payload, cache=None):
         """
         Query the specified data
 
         :param query_type: Query to make
         :param payload: Associated parameters
+        :param cache: If the cache should be used. None only uses it for CACHE_ENDPOINTS
+
+        :return: response json
+        """
+        use_cache = self._use_cache(query_type, cache)
+        cached = self._cached(query_type, payload) if use_cache else None
+        if cached is not None:
+            return cached
+
+        # Callers sharing a request share the raw bytes and decode them separately so they don't get the same object
+        if self._singleflight is None:
+            content = self._send_query(query_type, payload, use_cache)
+        else:
+            key = make_key(query_type, payload)
+            content = self._singleflight.do(key, lambda: self._send_query(query_type, payload, use_cache))
+
+        return self._decode(content)
+
+
+    @traced
+    async def query_async(self, query_type, payload, cache=None):
+        """
+        Same as query but can be awaited. The request is made in the default executor and shares in-flight
+        requests with query
+
+        :param query_type: Query to make
+        :param payload: Associated parameters
+        :param cache: If the cache should be used. None only uses it for CACHE_ENDPOINTS
 
         :return: response json
         """
-        if self.token_expired():
-            self.get_access_token()
+        use_cache = self._use_cache(query_type, cache)
+        cached = self._cached(query_type, payload) if use_cache else None
+        if cached is not None:
+            return cached
+
+        # Copy the context so the priority class is kept in the executor
+        ctx = contextvars.copy_context()
+        send = lambda: ctx.run(self._send_query, query_type, payload, use_cache)
+
+        if self._singleflight is None:
+            content = await asyncio.get_running_loop().run_in_executor(None, send)
+        else:
+            content = await self._singleflight.do_async(make_key(query_type, payload), send)
+
+        return self._decode(content)
+
+
+    def _span(self, name, **args):
+        """
+        Span for part of a call. Does nothing if there's no tracer
+
+        :param name: name of the span
+        :param args: extra info to attach to the span
+
+        :return: context manager
+        """
+        return self._tracer.span(name, **args) if self._tracer is not None else NULL_SPAN
+
+
+    def _use_cache(self, query_type, cache):
+        """
+        If the cache should be used for a query. Lookups by id are stable so they're cached by default. Anything under
+        them (e.g. an artist's albums), searches, browse and playlists can change so they're only cached if asked for
+
+        :param query_type: Query to make
+        :param cache: True or False to force it. None to decide by the endpoint
+
+        :return: bool
+        """
+        if self._cache is None or cache is False:
+            return False
+        if cache:
+            return True
+
+        parts = query_type.split("/")
+        return parts[0] in CACHE_ENDPOINTS and len(parts) <= 2
+
+
+    def _cached(self, query_type, payload):
+        """
+        Look for the response in the cache
+
+        :param query_type: Query to make
+        :param payload: Associated parameters
+
+        :return: response json or None
+        """
+        if self._cache is None:
+            return None
+
+        with self._span("cache"):
+            content = self._cache.get(repr(make_key(query_type, payload)))
+
+        if content is not None:
+            return self._decode(content)
+
+
+    def _decode(self, content):
+        """
+        Decode a response
+
+        :param content: response bytes
+
+        :return: response json
+        """
+        with self._span("decode"):
+            return json.loads(content)
+
+
+    def _send_query(self, query_type, payload, use_cache=False):
+        """
+        Actually send the query
+
+        :param query_type: Query to make
+        :param payload: Associated parameters
+        :param use_cache: If the response should be stored in the cache
+
+        :return: response bytes
+        """
+        with self._token_lock:
+            if self.token_expired():
+                self.get_access_token()
 
         url = f"{BASE_URL}{query_type}"
         headers = {"Authorization": "Bearer {}".format(self._access_token['access_token'])}
 
-        response = requests.get(url, headers=headers, params=payload)
-        time.sleep(3)
+        scheduler = self._scheduler if self._scheduler is not None else _fan_out_scheduler.get()
+        if scheduler is not None:
+            with self._span("rate_limit"):
+                scheduler.acquire()
+
+        with self._span("network", url=url):
+            response = self._transport.get(url, headers=headers, params=payload)
 
-        return json.loads(response.content)
+        if scheduler is None and self._query_delay:
+            with self._span("rate_limit"):
+                time.sleep(self._query_delay)
 
+        if use_cache and response.status_code == 200:
+            with self._span("cache"):
+                self._cache.put(repr(make_key(query_type, payload)), response.content)
 
-    def path_query(self, query_type, payload, path_params):
+        return response.content
+
+
+    def path_query(self, query_type, payload, path_params, cache=None):
         """
         When making a query with a modified path
 
         :param query_type: Query to make
         :param payload: Associated parameters
         :param path_params: Parameters to add to path -> must be in correct order
+        :param cache: If the cache should be used. None only uses it for CACHE_ENDPOINTS
 
         :return: response json
         """
         query_type = "/".join([query_type, *path_params])
-        return self.query(query_type, payload)
+        return self.query(query_type, payload, cache=cache)
 
 
+    @traced
     def get_ids(self, search_vals, search_type):
         """
         Get associated ids for a group of searched items
@@ -144,10 +343,10 @@ class Spotify:
         if isinstance(search_vals, str):
             search_vals = [search_vals]
 
-        # Search one at a time
+        # Search one at a time. We only use the top result so don't ask for more
         ids = []
         for search_val in search_vals:
-            search_items = self.search(search_val, search_type).get(f"{search_type}s", [])
+            search_items = self.search(search_val, search_type, limit=1).get(f"{search_type}s", [])
 
             if search_items and len(search_items['items']) > 0:
                 ids.append(search_items['items'][0]['id'])
@@ -156,6 +355,7 @@ class Spotify:
 
         return ids
 
+    @traced
     def get_id(self, search_val, search_type):
         """
         Get associated id for a one searched item
@@ -175,6 +375,7 @@ class Spotify:
     #################################################################
 
 
+    @traced
     def search(self, search_data, search_type, limit=3, market="US", offset=0):
         """
         Search for data
@@ -182,19 +383,27 @@ class Spotify:
         https://api.spotify.com/v1/search
 
         :param search_data: Search input 
-        :param search_type: Type of search you are conducting - ['artist', 'album', 'playlist', 'track']
-        :param limit: Number of albums to return 
+        :param search_type: Type of search you are conducting - ['artist', 'album', 'playlist', 'track']. Can be a
+                            list or comma separated str to search for several types at once
+        :param limit: Number of items to return for each type
         :param market: Only get from specific market where playable
         :param offset: index of first result to return
 
         :return: response data
         """
-        if not search_type in ['artist', 'album', 'playlist', 'track'] and isinstance(search_data, str):
+        if isinstance(search_type, str):
+            search_types = search_type.split(",")
+        elif isinstance(search_type, Iterable):
+            search_types = list(search_type)
+        else:
+            search_types = []
+
+        if not (search_types and all(t in SEARCH_TYPES for t in search_types)) and isinstance(search_data, str):
             print("Not a valid search type")
         else:
             payload = {
                 'q': search_data,
-                'type': search_type,
+                'type': ",".join(search_types),
                 'limit': limit,
                 'market': market,
                 'offset': offset
@@ -202,11 +411,60 @@ class Spotify:
             return self.query("search", payload)
 
 
+    @traced
+    def batch_search(self, search_data, search_types, limit=3, market="US", offset=0):
+        """
+        Search for several types of items in one request
+
+        https://api.spotify.com/v1/search
+
+        :param search_data: Search input
+        :param search_types: types to search for - ['artist', 'album', 'playlist', 'track']. Any iterable or a comma
+                             separated str
+        :param limit: Number of items to return for each type
+        :param market: Only get from specific market where playable
+        :param offset: index of first result to return
+
+        :return: dict of type -> list of items
+        """
+        # Read the types once so a generator isn't used up by the search
+        search_types = search_types.split(",") if isinstance(search_types, str) else list(search_types)
+
+        results = self.search(search_data, search_types, limit=limit, market=market, offset=offset) or {}
+        return {t: results.get(f"{t}s", {}).get("items", []) for t in search_types}
+
+
+    @traced
+    def resolve_ids(self, search_vals, search_types=('artist', 'album', 'track')):
+        """
+        Get the ids for a mixed group of names. Each name is searched once for all the types at the same time
+        rather than once per type and repeated names are only searched once
+
+        :param search_vals: Names to search for - list or str
+        :param search_types: Types each name could be
+
+        :return: list of dicts of type -> id (or None if not found). Same order as search_vals
+        """
+        if isinstance(search_vals, str):
+            search_vals = [search_vals]
+
+        resolved = {}
+        for search_val in search_vals:
+            if search_val in resolved:
+                continue
+
+            results = self.batch_search(search_val, list(search_types), limit=1)
+            resolved[search_val] = {t: items[0]['id'] if items else None for t, items in results.items()}
+
+        return [resolved[search_val] for search_val in search_vals]
+
+
     #################################################################
     ##########################  Browse API ##########################
     #################################################################
 
 
+    @traced
     def get_categories(self, country="US", locale="US", limit=20, offset=0):
         """
         Get all the music categories available 
@@ -226,53 +484,102 @@ class Spotify:
         return self.path_query("browse", payload, path_params)['categories']['items']
 
 
+    @traced
+    def get_all_categories(self, country="US", locale="US"):
+        """
+        Get every page of the music categories available
+
+        https://api.spotify.com/v1/browse/categories
+
+        :param country: Where content is playable. None for every country
+        :param locale: language
+
+        :return: list of category objects. Raises a RuntimeError if a page returns an error rather than give back
+                 part of the list
+        """
+        limit = 50
+        categories = []
+        path_params = ["categories"]
+
+        offset, total = 0, 1
+        while offset < total:
+            payload = {"limit": limit, "locale": locale, "offset": offset}
+            if country is not None:
+                payload["country"] = country
+            results = self.path_query("browse", payload, path_params)
+            if "error" in results:
+                raise RuntimeError(f"Spotify returned an error: {results['error']}")
+
+            page = results.get('categories', {})
+
+            items = page.get('items', [])
+            categories.extend(items)
+            if not items:
+                break
+
+            total = page.get('total', 0)
+            offset += limit
+
+        return categories
+
+
+    @traced
     def get_category(self, category, country="US", locale="US"):
         """
         Get the info for a given category
         
         https://api.spotify.com/v1/browse/categories/{category_id}
         
-        :param category: id of category
+        :param category: id of category - case sensitive, e.g. '0JQ5DAqbMKFEC4WFtoNRpw'
         :param country: exists for supplied country
         :param locale: language
         
         :return: dict of info
         """
-        if category.lower() not in CAT_IDS:
+        if not self._metadata.is_category(self, category, country):
             raise ValueError(f"{category} is not one of the possible category ids")
 
         payload = {"country": country, "locale": locale}
-        path_params = ["categories", category.lower()]
+        path_params = ["categories", category]
 
         return self.path_query("browse", payload, path_params)
 
 
+    @traced
     def get_category_playlists(self, category, country="US", limit=20, offset=0):
         """
         Get the info for a given category
 
         https://api.spotify.com/v1/browse/categories/{category_id}/playlists
 
-        :param category: id of category
+        :param category: id of category - case sensitive, e.g. '0JQ5DAqbMKFEC4WFtoNRpw'
         :param country: country to get for
         :param limit: # of items to return
         :param offset: index of first item to return
 
         :return: list of info
         """
-        if category.lower() not in CAT_IDS:
+        if not self._metadata.is_category(self, category, country):
             raise ValueError(f"{category} is not one of the possible category ids")
 
+        return self._category_playlists(category, country, limit, offset)
+
+
+    def _category_playlists(self, category, country="US", limit=20, offset=0):
+        """
+        get_category_playlists without checking the category id
+        """
         if not 51 > limit > 0:
             raise ValueError("Can only retrieve a maximum of 50 category playlists")
 
         payload = {"country": country, "limit": limit, "offset": offset}
-        path_params = ["categories", category.lower(), "playlists"]
+        path_params = ["categories", category, "playlists"]
 
         results = self.path_query("browse", payload, path_params)
         return results['playlists']['items'] if 'playlists' in results else []
 
 
+    @traced
     def get_genre_seeds(self):
         """
         Get all the possible genres
@@ -286,6 +593,7 @@ class Spotify:
 
     # TODO: Get this to work
     # TODO: Add min, max, and target params for tuneable track attributes
+    @traced
     def get_recommendations(self, seed_artists, seed_tracks, seed_genres, limit=20, market="US"):
         """
         Get recommendations for new music
@@ -311,6 +619,12 @@ class Spotify:
         if isinstance(seed_tracks, str):
             seed_tracks = [seed_tracks]
 
+        # Genre seeds are all lower case. Empty strings are dropped so "" means no genres
+        seed_genres = [genre.lower() for genre in seed_genres if genre]
+        for genre in seed_genres:
+            if not self._metadata.is_genre(self, genre):
+                raise ValueError(f"{genre} is not one of the possible genre seeds")
+
         payload = {
             "seed_artists": ",".join(seed_artists),
             "seed_genres": ",".join(seed_genres),
@@ -322,6 +636,7 @@ class Spotify:
         return self.query("recommendations", payload).get("tracks", [])
 
 
+    @traced
     def get_featured_playlists(self, timestamp=None, country="US", locale="US", limit=20, offset=0):
         """
         Get all featured playlists
@@ -362,6 +677,7 @@ class Spotify:
         return results['playlists']['items'] if 'playlists' in results else []
 
 
+    @traced
     def get_new_releases(self, country="US", limit=20, offset=0):
         """
         Get the new album releases on spotify
@@ -388,6 +704,7 @@ class Spotify:
     #################################################################
 
 
+    @traced
     def get_artists(self, artists, artist_id=False):
         """
         Get the data for a given artists name or id
@@ -412,6 +729,7 @@ class Spotify:
             return results.get("artists", [])
 
 
+    @traced
     def get_artist_albums(self, artist, artist_id=False, include_groups=None, limit=20):
         """
         Get the albums for an artist
@@ -446,6 +764,7 @@ class Spotify:
             return results.get("items", [])
 
 
+    @traced
     def get_top_tracks(self, artist, country, artist_id=False):
         """
         Get the top tracks for an artist
@@ -469,6 +788,7 @@ class Spotify:
             return results.get("tracks", [])
 
 
+    @traced
     def get_related_artists(self, artist, artist_id=False):
         """
         Get the related artist for a given artist 
@@ -495,6 +815,7 @@ class Spotify:
     #################################################################
 
 
+    @traced
     def get_albums(self, albums, album_id=False, market="US"):
         """
         Get album info for # of albums
@@ -520,6 +841,7 @@ class Spotify:
             return results.get("albums", [])
 
 
+    @traced
     def get_album_tracks(self, album, album_id=False, limit=20, market='US'):
         """
         Get the tracks for a given album
@@ -552,6 +874,7 @@ class Spotify:
     #################################################################
 
 
+    @traced
     def get_tracks(self, tracks, track_id=False, market="US"):
         """
         Get list of track information
@@ -577,6 +900,7 @@ class Spotify:
             return results.get("tracks", [])
 
 
+    @traced
     def get_audio_features(self, tracks, track_id=False):
         """
         Get audio features for multiple tracks
@@ -610,6 +934,7 @@ class Spotify:
                 return results.get("audio_features", [])
 
 
+    @traced
     def get_audio_analysis(self, track, track_id=False):
         """
         Get audio analysis for a single tracks
@@ -633,26 +958,32 @@ class Spotify:
     ########################  Playlist API ##########################
     #################################################################
 
-    def get_playlist(self, playlist_id):
+    @traced
+    def get_playlist(self, playlist_id, fields=None):
         """
         Get info on playlist
 
+        https://api.spotify.com/v1/playlists/{playlist_id}
+
         :param playlist_id spotify id for playlist
+        :param fields: Only return these fields - e.g. "snapshot_id,tracks.total"
 
         :return: dict of info
         """
+        payload = {"fields": fields} if fields is not None else {}
         path_params = [playlist_id]
-        return self.path_query("playlists", {}, path_params)
+        return self.path_query("playlists", payload, path_params)
 
 
-    def get_playlist_tracks(self, playlist_id):
+    @traced
+    def get_playlist_tracks(self, playlist_id, num_tracks=None):
         """
         Returns the tracks in a playlist
 
-        https://api.spotify.com/v1/playlists/{playlist_id} 
+        https://api.spotify.com/v1/playlists/{playlist_id}/tracks
 
         :param playlist_id: spotify id for playlist
-        :param num_tracks: Number of tracks to return
+        :param num_tracks: Number of tracks in the playlist. If None we look it up first
 
         :return: list of tracks (each is a dict)
         """
@@ -660,7 +991,8 @@ class Spotify:
         tracks = []
         path_params = [playlist_id, "tracks"]
 
-        num_tracks = self.get_playlist(playlist_id)['tracks']['total']
+        if num_tracks is None:
+            num_tracks = self.get_playlist(playlist_id, fields="tracks.total")['tracks']['total']
 
         # The Api only allows 100 at a time
         # We can change the offset (index) where to start from though
@@ -676,3 +1008,120 @@ class Spotify:
         return tracks
 
 
+    @traced
+    def sync_playlists(self, playlist_ids, store=None):
+        """
+        Incrementally sync a group of playlists against a local store.
+
+        For each playlist we only ask for the snapshot_id. The tracks are only pulled when it differs from the
+        one stored. Playlists not yet in the store are fully pulled and everything counts as added.
+
+        :param playlist_ids: spotify ids for playlists - str or list
+        :param store: PlaylistStore to sync against. If None an in memory one is used
+
+        :return: dict of playlist_id -> {'snapshot_id', 'added', 'removed'} for playlists that changed.
+                 'added' is a list of track objects and 'removed' a list of track ids
+        """
+        if isinstance(playlist_ids, str):
+            playlist_ids = [playlist_ids]
+        if store is None:
+            store = PlaylistStore()
+
+        changes = {}
+        for playlist_id in playlist_ids:
+            info = self.get_playlist(playlist_id, fields="snapshot_id,tracks.total")
+            if 'snapshot_id' not in info:
+                print(playlist_id, "not found")
+                continue
+
+            stored = store.get(playlist_id)
+            if stored is not None and stored['snapshot_id'] == info['snapshot_id']:
+                continue
+
+            tracks = self.get_playlist_tracks(playlist_id, num_tracks=info['tracks']['total'])
+            added, removed = diff_tracks(stored['tracks'] if stored else [], tracks)
+
+            store.put(playlist_id, info['snapshot_id'], [track_key(t) for t in tracks])
+            changes[playlist_id] = {"snapshot_id": info['snapshot_id'], "added": added, "removed": removed}
+
+        store.save()
+
+        return changes
+
+
+    #################################################################
+    ######################  Market Fan-out ##########################
+    #################################################################
+
+
+    @traced
+    def fan_out_markets(self, method, markets, concurrency=8, **kwargs):
+        """
+        Call a market scoped method for several markets at the same time.
+
+        The requests are sent from a pool of threads. They go through the Spotify object's Scheduler or if there
+        isn't one, a Scheduler for just this call that sends one request every query_delay seconds. Artist names are
+        only resolved to an id once and category ids are only checked once.
+
+        :param method: one of MARKET_METHODS
+        :param markets: list of countries - e.g. ['US', 'GB', 'DE']
+        :param concurrency: Max requests at the same time
+        :param kwargs: other arguments for the method
+
+        :return: dict of market -> result of the method for that market
+        """
+        if method not in MARKET_METHODS:
+            raise ValueError(f"{method} is not one of the market methods - {MARKET_METHODS}")
+
+        if method == "get_top_tracks" and not kwargs.get("artist_id"):
+            kwargs["artist"] = self.get_id(kwargs["artist"], "artist")
+            kwargs["artist_id"] = True
+            if kwargs["artist"] is None:
+                return {}
+
+        fn = getattr(self, method)
+        markets = list(dict.fromkeys(markets))
+
+        # Check the category once against the list for every country rather than fetch the list for each market
+        if method == "get_category_playlists":
+            if not self._metadata.is_category(self, kwargs["category"], None):
+                raise ValueError(f"{kwargs['category']} is not one of the possible category ids")
+            fn = self._category_playlists
+
+        # Each call gets a copy of the context so the priority class, tracing and pacing carry over into the threads
+        token = None
+        if self._scheduler is None and self._query_delay:
+            token = _fan_out_scheduler.set(Scheduler(rate=1 / self._query_delay))
+
+        try:
+            with ThreadPoolExecutor(max(1, min(concurrency, len(markets)))) as pool:
+                futures = {
+                    market: pool.submit(contextvars.copy_context().run, fn, country=market, **kwargs)
+                    for market in markets
+                }
+        finally:
+            if token is not None:
+                _fan_out_scheduler.reset(token)
+
+        return {market: future.result() for market, future in futures.items()}
+
+
+    @traced
+    def get_top_tracks_markets(self, artist, markets, artist_id=False, matrix=False, concurrency=8):
+        """
+        Get the top tracks for an artist in several markets
+
+        https://api.spotify.com/v1/artists/{id}/top-tracks
+
+        :param artist: name or id of artist
+        :param markets: list of countries
+        :param artist_id: If providing id
+        :param matrix: If True return the availability matrix instead
+        :param concurrency: Max requests at the same time
+
+        :return: dict of market -> list of track objects or the availability matrix
+        """
+        results = self.fan_out_markets("get_top_tracks", markets, concurrency=concurrency,
+                                       artist=artist, artist_id=artist_id)
+        return availability_matrix(results) if matrix else results
+
@@ -0,0 +1,162 @@
+"""
+Opt in tracing of the time spent in each call.
+
+Pass a Tracer to Spotify(tracer=...) and every public method records a span. Inside each query the time spent on
+the cache, token refresh, rate limiting, network and json decoding get their own spans. Spans are nested by the
+context they're made in so the time for get_id shows up under get_artist_albums etc.
+
+Traces can be exported in the Chrome trace event format (open in chrome://tracing or https://ui.perfetto.dev) or
+as json lines.
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+# Returned by span() when tracing is off. nullcontext can be reused so there's nothing to build per call
+NULL_SPAN = nullcontext()
+
+
+class Tracer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._start = time.perf_counter_ns()
+        self.spans = []
+
+    @contextmanager
+    def span(self, name, **args):
+        """
+        Time the code run inside the block
+
+        :param name: name of the span
+        :param args: extra info to attach to the span
+
+        :return: None
+        """
+        with self._lock:
+            span_id = self._next_id
+            self._next_id += 1
+
+        parent = _current_span.get()
+        token = _current_span.set(span_id)
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            _current_span.reset(token)
+
+            span = {
+                "id": span_id,
+                "parent": parent,
+                "name": name,
+                "start_us": (start - self._start) / 1000,
+                "dur_us": (end - start) / 1000,
+                "tid": threading.get_ident(),
+                "args": args,
+            }
+            with self._lock:
+                self.spans.append(span)
+
+    def clear(self):
+        """
+        Drop all recorded spans
+
+        :return: None
+        """
+        with self._lock:
+            self.spans = []
+
+    def summary(self):
+        """
+        Total time and count for each span name
+
+        :return: dict of name -> {'count', 'total_us'}
+        """
+        totals = {}
+        with self._lock:
+            for span in self.spans:
+                total = totals.setdefault(span["name"], {"count": 0, "total_us": 0})
+                total["count"] += 1
+                total["total_us"] += span["dur_us"]
+
+        return totals
+
+    def to_chrome(self):
+        """
+        :return: dict in the Chrome trace event format
+        """
+        pid = os.getpid()
+        with self._lock:
+            events = [
+                {
+                    "name": span["name"],
+                    "ph": "X",
+                    "ts": span["start_us"],
+                    "dur": span["dur_us"],
+                    "pid": pid,
+                    "tid": span["tid"],
+                    "args": {"id": span["id"], "parent": span["parent"], **span["args"]},
+                }
+                for span in sorted(self.spans, key=lambda s: s["start_us"])
+            ]
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome(self, path):
+        """
+        Write the trace in the Chrome trace event format
+
+        :param path: file to write to
+
+        :return: None
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_chrome(), f)
+
+    def export_jsonl(self, path):
+        """
+        Write each span as a line of json
+
+        :param path: file to write to
+
+        :return: None
+        """
+        with self._lock:
+            spans = list(self.spans)
+
+        with open(path, "w") as f:
+            for span in spans:
+                f.write(json.dumps(span) + "\n")
+
+
+def traced(fn):
+    """
+    Record a span named after the method whenever the object it's called on has a tracer
+    """
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(self, *args, **kwargs):
+            if self._tracer is None:
+                return await fn(self, *args, **kwargs)
+            with self._tracer.span(fn.__name__):
+                return await fn(self, *args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        if self._tracer is None:
+            return fn(self, *args, **kwargs)
+        with self._tracer.span(fn.__name__):
+            return fn(self, *args, **kwargs)
+
+    return wrapper
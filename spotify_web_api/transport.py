@@ -0,0 +1,171 @@
+"""
+Transports used by the Spotify client to send its http requests.
+
+Every request the client makes goes through a transport's get or post. Any object with those two methods that
+returns a Response can be passed to Spotify(transport=...).
+
+Implementations:
+    - RequestsTransport: requests with a shared session (default)
+    - HTTPXTransport: httpx with HTTP/2 so concurrent requests share one multiplexed connection
+    - FakeTransport: in memory responses for tests and benchmarks. Never touches the network
+"""
+
+import json
+import threading
+from urllib.parse import urlencode
+
+import requests
+
+
+class Response:
+    """
+    Minimal response returned by all the transports
+    """
+    def __init__(self, status_code, content, headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class Transport:
+    """
+    Interface for sending requests. Subclasses need to implement get and post.
+    """
+    def get(self, url, headers=None, params=None):
+        """
+        Send a GET request
+
+        :param url: Full url
+        :param headers: dict of headers
+        :param params: dict of query parameters
+
+        :return: Response
+        """
+        raise NotImplementedError
+
+    def post(self, url, data=None, headers=None):
+        """
+        Send a POST request with a form encoded body
+
+        :param url: Full url
+        :param data: dict of form data
+        :param headers: dict of headers
+
+        :return: Response
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Release any open connections
+
+        :return: None
+        """
+        pass
+
+
+class RequestsTransport(Transport):
+    """
+    Send requests with the requests library. A session is used so connections are kept alive between queries.
+    """
+    def __init__(self, session=None):
+        self._session = session if session is not None else requests.Session()
+
+    def get(self, url, headers=None, params=None):
+        r = self._session.get(url, headers=headers, params=params)
+        return Response(r.status_code, r.content, r.headers)
+
+    def post(self, url, data=None, headers=None):
+        r = self._session.post(url, data=data, headers=headers)
+        return Response(r.status_code, r.content, r.headers)
+
+    def close(self):
+        self._session.close()
+
+
+class HTTPXTransport(Transport):
+    """
+    Send requests with httpx over HTTP/2. The client can be shared between threads and concurrent requests to the
+    same host are multiplexed over a single connection.
+
+    Requires the http2 extra -> pip install httpx[http2]
+    """
+    def __init__(self, http2=True, timeout=30, client=None):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("HTTPXTransport requires httpx. Install it with: pip install httpx[http2]")
+
+        self._client = client if client is not None else httpx.Client(http2=http2, timeout=timeout)
+
+    def get(self, url, headers=None, params=None):
+        r = self._client.get(url, headers=headers, params=params)
+        return Response(r.status_code, r.content, r.headers)
+
+    def post(self, url, data=None, headers=None):
+        r = self._client.post(url, data=data, headers=headers)
+        return Response(r.status_code, r.content, r.headers)
+
+    def close(self):
+        self._client.close()
+
+
+class FakeTransport(Transport):
+    """
+    Serve canned responses from memory.
+
+    Responses are registered per url with add(). The body can be a dict or a function taking the query params and
+    returning a dict. POSTs to a url that isn't registered return a valid client credentials token since the only
+    POST the client makes is for the access token. Every request is recorded in calls as (method, url, params).
+    """
+    TOKEN = {"access_token": "fake-token", "token_type": "Bearer", "expires_in": 3600}
+
+    def __init__(self, routes=None):
+        self._routes = {}
+        self._lock = threading.Lock()
+        self.calls = []
+
+        for url, body in (routes or {}).items():
+            self.add(url, body)
+
+    def add(self, url, body, method="GET", status_code=200):
+        """
+        Register a response
+
+        :param url: Full url without the query string
+        :param body: dict or function of the params that returns a dict
+        :param method: GET or POST
+        :param status_code: status code to return
+
+        :return: None
+        """
+        self._routes[(method, url)] = (body, status_code)
+
+    def _respond(self, method, url, params):
+        with self._lock:
+            self.calls.append((method, url, params))
+
+        if (method, url) not in self._routes:
+            if method == "POST":
+                return Response(200, json.dumps(self.TOKEN).encode("utf-8"))
+            error = {"error": {"status": 404, "message": f"No fake response for {url}?{urlencode(params or {})}"}}
+            return Response(404, json.dumps(error).encode("utf-8"))
+
+        body, status_code = self._routes[(method, url)]
+        if callable(body):
+            body = body(params or {})
+
+        return Response(status_code, json.dumps(body).encode("utf-8"))
+
+    def get(self, url, headers=None, params=None):
+        return self._respond("GET", url, params)
+
+    def post(self, url, data=None, headers=None):
+        return self._respond("POST", url, data)
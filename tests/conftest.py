@@ -0,0 +1,22 @@
+"""
+Fixtures shared by the offline tests
+"""
+from spotify_web_api.spotify_api import Spotify
+from spotify_web_api.transport import FakeTransport
+import pytest
+
+
+@pytest.fixture
+def make_spy():
+    """Build a Spotify object that talks to a FakeTransport and doesn't wait between queries"""
+    def make(transport=None, **kwargs):
+        kwargs.setdefault("query_delay", 0)
+        transport = transport if transport is not None else FakeTransport()
+        return Spotify(client_id="id", client_secret="secret", transport=transport, **kwargs)
+
+    return make
+
+@pytest.fixture
+def num_gets():
+    """Count the GET requests a FakeTransport has served"""
+    return lambda transport: len([c for c in transport.calls if c[0] == "GET"])
@@ -0,0 +1,100 @@
+"""
+Tests for the cli.py file
+"""
+from spotify_web_api.spotify_api import BASE_URL
+from spotify_web_api.transport import FakeTransport
+from spotify_web_api import cli
+import io
+import json
+import pytest
+
+
+@pytest.fixture
+def transport():
+    return FakeTransport({
+        f"{BASE_URL}tracks": lambda params: {"tracks": [{"id": i} for i in params['ids'].split(",")]},
+        f"{BASE_URL}search": lambda params: {"tracks": {"items": [{"id": params['q'].upper()}]}},
+    })
+
+@pytest.fixture
+def spy(transport, make_spy):
+    return make_spy(transport)
+
+@pytest.fixture
+def ids(tmp_path):
+    path = tmp_path / "ids.txt"
+    path.write_text("".join(f"id{i}\n" for i in range(120)))
+    return str(path)
+
+
+def run(spy, args):
+    out = io.StringIO()
+    assert cli.main(args + ["--quiet"], spy=spy, out=out) == 0
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_tracks_batched(spy, transport, ids, num_gets):
+    """Test ids are fetched in batches of 50 and every one is written out"""
+    lines = run(spy, ["tracks", ids, "--concurrency", "3"])
+
+    assert sorted(line["input"] for line in lines) == sorted(f"id{i}" for i in range(120))
+    assert all(line["data"] == {"id": line["input"]} for line in lines)
+    assert num_gets(transport) == 3
+
+
+def test_names(spy, tmp_path):
+    """Test names are resolved before fetching"""
+    path = tmp_path / "names.txt"
+    path.write_text("abc\ndef\n")
+
+    lines = run(spy, ["tracks", str(path), "--names"])
+    assert sorted((line["input"], line["data"]["id"]) for line in lines) == [("abc", "ABC"), ("def", "DEF")]
+
+
+def test_resume(spy, transport, ids, tmp_path):
+    """Test inputs recorded in the resume file are skipped"""
+    resume = tmp_path / "done.txt"
+    resume.write_text("".join(f"id{i}\n" for i in range(100)))
+
+    lines = run(spy, ["tracks", ids, "--resume", str(resume)])
+    assert sorted(line["input"] for line in lines) == sorted(f"id{i}" for i in range(100, 120))
+    assert len(resume.read_text().split()) == 120
+
+    assert run(spy, ["tracks", ids, "--resume", str(resume)]) == []
+
+
+def test_failed_batch(spy, transport, ids, tmp_path):
+    """Test a batch that gets an error isn't written or marked as done and the exit code says so"""
+    def throttled(params):
+        if "id0" in params["ids"].split(","):
+            return {"error": {"status": 429, "message": "API rate limit exceeded"}}
+        return {"tracks": [{"id": i} for i in params["ids"].split(",")]}
+
+    transport.add(f"{BASE_URL}tracks", throttled)
+    resume = tmp_path / "done.txt"
+    out = io.StringIO()
+
+    assert cli.main(["tracks", ids, "--resume", str(resume), "--quiet"], spy=spy, out=out) == 1
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert sorted(line["input"] for line in lines) == sorted(f"id{i}" for i in range(50, 120))
+    assert "id0" not in resume.read_text().split()
+
+
+def test_failed_search(spy, transport, tmp_path):
+    """Test an error while resolving names fails the batch instead of writing the names as not found"""
+    transport.add(f"{BASE_URL}search", {"error": {"status": 429, "message": "API rate limit exceeded"}}, status_code=429)
+    path = tmp_path / "names.txt"
+    path.write_text("abc\n")
+    out = io.StringIO()
+
+    assert cli.main(["tracks", str(path), "--names", "--quiet"], spy=spy, out=out) == 1
+    assert out.getvalue() == ""
+
+
+def test_bad_concurrency(spy, ids, capsys):
+    """Test a concurrency under 1 gives the usage message instead of a traceback"""
+    with pytest.raises(SystemExit) as e:
+        cli.main(["tracks", ids, "--concurrency", "0"], spy=spy)
+
+    assert e.value.code == 2
+    assert "--concurrency: must be at least 1" in capsys.readouterr().err
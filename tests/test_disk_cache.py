@@ -0,0 +1,142 @@
+"""
+Tests for the disk_cache.py file
+"""
+from spotify_web_api.spotify_api import BASE_URL
+from spotify_web_api.disk_cache import DiskCache
+from spotify_web_api.transport import FakeTransport
+from spotify_web_api.playlist_sync import PlaylistStore
+import json
+import time
+import pytest
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DiskCache(str(tmp_path / "cache"))
+
+
+def test_put_get(cache):
+    """Test responses can be stored and retrieved"""
+    cache.put("a", b'{"a": 1}')
+    assert cache.get("a") == b'{"a": 1}'
+    assert cache.get("b") is None
+
+
+def test_overwrite(cache):
+    """Test overwriting a key returns the newest value and doesn't add an entry"""
+    cache.put("a", b"1")
+    cache.put("a", b"2")
+    assert cache.get("a") == b"2"
+    assert len(cache) == 1
+
+
+def test_compressed(cache):
+    """Test large responses are compressed on disk"""
+    content = json.dumps({"segments": [{"start": 0.0, "pitches": [0.5] * 12}] * 2000}).encode("utf-8")
+    cache.put("analysis", content)
+
+    assert cache.stats()["segment_bytes"] < len(content) / 10
+    assert cache.get("analysis") == content
+
+
+def test_survives_restart(tmp_path):
+    """Test entries are still there after reopening and the index grows past its initial capacity"""
+    cache = DiskCache(str(tmp_path / "cache"), capacity=4)
+    for i in range(50):
+        cache.put(f"key-{i}", f"value-{i}".encode("utf-8"))
+    cache.close()
+
+    cache = DiskCache(str(tmp_path / "cache"))
+    assert len(cache) == 50
+    assert cache.stats()["capacity"] > 50
+    assert all(cache.get(f"key-{i}") == f"value-{i}".encode("utf-8") for i in range(50))
+
+
+def test_max_age(tmp_path):
+    """Test expired entries aren't returned"""
+    cache = DiskCache(str(tmp_path / "cache"), max_age=.05)
+    cache.put("a", b"1")
+    assert cache.get("a") == b"1"
+
+    time.sleep(.1)
+    assert cache.get("a") is None
+
+
+def test_max_size(tmp_path):
+    """Test the oldest entries are evicted once the segment gets too large"""
+    cache = DiskCache(str(tmp_path / "cache"), max_size=2000, level=0)
+    for i in range(20):
+        cache.put(f"key-{i}", bytes([i]) * 200)
+
+    assert cache.stats()["segment_bytes"] <= 2000
+    assert cache.get("key-0") is None
+    assert cache.get("key-19") == bytes([19]) * 200
+
+
+def test_min_size(tmp_path):
+    """Test small responses are skipped"""
+    cache = DiskCache(str(tmp_path / "cache"), min_size=10)
+    cache.put("a", b"1")
+    assert cache.get("a") is None
+
+
+def test_spotify_cache(tmp_path, make_spy, num_gets):
+    """Test a cached response is reused by a new client without a request"""
+    url = f"{BASE_URL}audio-analysis/abc"
+    cache = DiskCache(str(tmp_path / "cache"))
+
+    transport = FakeTransport({url: {"track": {"tempo": 120}}})
+    spy = make_spy(transport, cache=cache)
+    assert spy.path_query("audio-analysis", {}, ["abc"]) == {"track": {"tempo": 120}}
+    cache.close()
+
+    transport = FakeTransport()
+    cache = DiskCache(str(tmp_path / "cache"))
+    spy = make_spy(transport, cache=cache)
+    assert spy.path_query("audio-analysis", {}, ["abc"]) == {"track": {"tempo": 120}}
+    assert num_gets(transport) == 0
+
+
+def test_errors_not_cached(cache, make_spy):
+    """Test error responses aren't stored"""
+    spy = make_spy(cache=cache)
+    spy.query("artists", {})
+    assert len(cache) == 0
+
+
+def test_only_stable_endpoints(cache, make_spy, num_gets):
+    """Test searches and anything nested under an id aren't cached unless asked for"""
+    transport = FakeTransport({
+        f"{BASE_URL}search": {"artists": {"items": []}},
+        f"{BASE_URL}artists/abc/albums": {"items": []},
+        f"{BASE_URL}artists": {"artists": []},
+    })
+    spy = make_spy(transport, cache=cache)
+
+    for _ in range(2):
+        spy.query("search", {"q": "converge"})
+        spy.path_query("artists", {}, ["abc", "albums"])
+        spy.query("artists", {"ids": "abc"})
+    assert num_gets(transport) == 5
+
+    spy.query("search", {"q": "converge"}, cache=True)
+    spy.query("search", {"q": "converge"}, cache=True)
+    assert num_gets(transport) == 6
+
+
+def test_sync_playlists_with_cache(cache, make_spy):
+    """Test a cache doesn't hide changes to a playlist from sync_playlists"""
+    playlist = {"snapshot_id": "1", "tracks": {"total": 1}}
+    items = [{"track": {"id": "a"}}]
+    transport = FakeTransport({
+        f"{BASE_URL}playlists/pl": lambda params: playlist,
+        f"{BASE_URL}playlists/pl/tracks": lambda params: {"items": items},
+    })
+    spy = make_spy(transport, cache=cache)
+    store = PlaylistStore()
+
+    assert [t["track"]["id"] for t in spy.sync_playlists("pl", store)["pl"]["added"]] == ["a"]
+
+    playlist = {"snapshot_id": "2", "tracks": {"total": 2}}
+    items = [{"track": {"id": "a"}}, {"track": {"id": "b"}}]
+    assert [t["track"]["id"] for t in spy.sync_playlists("pl", store)["pl"]["added"]] == ["b"]
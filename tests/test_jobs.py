@@ -0,0 +1,92 @@
+"""
+Tests for the jobs.py file
+"""
+from spotify_web_api.spotify_api import BASE_URL
+from spotify_web_api.jobs import JobStore
+from spotify_web_api.transport import FakeTransport
+from spotify_web_api import jobs
+import pytest
+
+
+class Throttle:
+    """Playlist page that fails after a number of calls"""
+    def __init__(self, fail_after):
+        self.calls = 0
+        self.fail_after = fail_after
+
+    def __call__(self, params):
+        self.calls += 1
+        if self.fail_after is not None and self.calls > self.fail_after:
+            return {"error": {"status": 429, "message": "API rate limit exceeded"}}
+
+        offset = int(params["offset"])
+        items = [{"track": {"id": f"t{i}"}} for i in range(offset, min(offset + 100, 250))]
+        return {"total": 250, "items": items}
+
+
+def test_resume_playlist(tmp_path, make_spy):
+    """Test a job that gets throttled picks up from the page it stopped at"""
+    store = JobStore(str(tmp_path / "jobs.db"))
+    url = f"{BASE_URL}playlists/pl/tracks"
+    snapshot = {f"{BASE_URL}playlists/pl": {"snapshot_id": "s1"}}
+
+    throttle = Throttle(fail_after=2)
+    with pytest.raises(RuntimeError):
+        jobs.playlist_tracks(make_spy(FakeTransport({**snapshot, url: throttle})), store, "pl")
+    store.close()
+
+    store = JobStore(str(tmp_path / "jobs.db"))
+    page = Throttle(fail_after=None)
+    tracks = jobs.playlist_tracks(make_spy(FakeTransport({**snapshot, url: page})), store, "pl")
+
+    assert [t["track"]["id"] for t in tracks] == [f"t{i}" for i in range(250)]
+    assert page.calls == 1
+
+    # Finished jobs are served from the store
+    jobs.playlist_tracks(make_spy(FakeTransport({**snapshot, url: page})), store, "pl")
+    assert page.calls == 1
+
+
+def test_playlist_changed(make_spy):
+    """Test a playlist whose snapshot id changed is fetched from the start again"""
+    store = JobStore()
+    url = f"{BASE_URL}playlists/pl/tracks"
+
+    jobs.playlist_tracks(make_spy(FakeTransport({f"{BASE_URL}playlists/pl": {"snapshot_id": "s1"},
+                                                 url: Throttle(fail_after=None)})), store, "pl")
+
+    page = Throttle(fail_after=None)
+    transport = FakeTransport({f"{BASE_URL}playlists/pl": {"snapshot_id": "s2"}, url: page})
+    tracks = jobs.playlist_tracks(make_spy(transport), store, "pl")
+
+    assert len(tracks) == 250
+    assert page.calls == 3
+    assert store.get_meta("playlist-tracks:pl")["version"] == "s2"
+
+
+def test_audio_features(make_spy):
+    """Test ids are fetched 100 at a time and only the missing batches are refetched"""
+    store = JobStore()
+    track_ids = [f"t{i}" for i in range(250)]
+    transport = FakeTransport({
+        f"{BASE_URL}audio-features": lambda params: {"audio_features": [{"id": i} for i in params["ids"].split(",")]}
+    })
+    spy = make_spy(transport)
+
+    store.save("features", 100, [{"id": "cached"}])
+    features = jobs.audio_features(spy, store, track_ids, name="features")
+
+    assert len(features) == 151
+    assert features[100] == {"id": "cached"}
+    assert [c[2]["ids"].count(",") + 1 for c in transport.calls if c[0] == "GET"] == [100, 50]
+
+
+def test_save_once():
+    """Test saving a chunk twice keeps the first result"""
+    store = JobStore()
+    store.save("job", 0, [1])
+    store.save("job", 0, [2])
+    assert store.completed("job") == {"0": [1]}
+
+    store.clear("job")
+    assert store.completed("job") == {}
@@ -0,0 +1,94 @@
+"""
+Tests for the market fan-out in the spotify_api.py file
+"""
+from spotify_web_api.spotify_api import BASE_URL, availability_matrix
+from spotify_web_api.transport import FakeTransport
+import threading
+import time
+import pytest
+
+
+def search(params):
+    return {"artists": {"items": [{"id": "converge"}]}}
+
+
+def top_tracks(params):
+    return {"tracks": [{"id": "shared"}, {"id": f"only-{params['country']}"}]}
+
+
+@pytest.fixture
+def transport():
+    return FakeTransport({
+        f"{BASE_URL}search": search,
+        f"{BASE_URL}artists/converge/top-tracks": top_tracks,
+    })
+
+@pytest.fixture
+def spy(transport, make_spy):
+    return make_spy(transport)
+
+
+def test_artist_resolved_once(spy, transport):
+    """Test the artist name is only searched for once however many markets there are"""
+    results = spy.get_top_tracks_markets("converge", ["US", "GB", "DE"])
+
+    assert sorted(results) == ["DE", "GB", "US"]
+    assert len([c for c in transport.calls if c[1] == f"{BASE_URL}search"]) == 1
+
+
+def test_markets_deduped(spy, transport):
+    """Test each market is only requested once"""
+    results = spy.get_top_tracks_markets("converge", ["US", "GB", "US", "GB"], artist_id=True)
+
+    assert list(results) == ["US", "GB"]
+    assert sorted(c[2]["country"] for c in transport.calls if c[0] == "GET") == ["GB", "US"]
+
+
+def test_concurrent(transport, spy):
+    """Test the markets are requested at the same time. The barrier only opens once all 4 requests are waiting"""
+    barrier = threading.Barrier(4, timeout=2)
+
+    def wait(params):
+        barrier.wait()
+        return top_tracks(params)
+
+    transport.add(f"{BASE_URL}artists/converge/top-tracks", wait)
+    results = spy.get_top_tracks_markets("converge", ["US", "GB", "DE", "JP"], artist_id=True, concurrency=4)
+    assert len(results) == 4
+
+
+def test_paced_without_scheduler(transport, make_spy):
+    """Test the fan-out sends one request every query_delay seconds when there's no Scheduler"""
+    times = []
+
+    def record(params):
+        times.append(time.monotonic())
+        return top_tracks(params)
+
+    transport.add(f"{BASE_URL}artists/converge/top-tracks", record)
+    spy = make_spy(transport, query_delay=.1)
+    spy.get_top_tracks_markets("converge", ["US", "GB", "DE", "JP"], artist_id=True, concurrency=4)
+
+    times.sort()
+    assert all(b - a >= .09 for a, b in zip(times, times[1:]))
+
+
+def test_matrix(spy):
+    """Test tracks found in several markets are only kept once"""
+    matrix = spy.get_top_tracks_markets("converge", ["US", "GB"], artist_id=True, matrix=True)
+
+    assert sorted(matrix["items"]) == ["only-GB", "only-US", "shared"]
+    assert matrix["markets"]["shared"] == ["GB", "US"]
+    assert matrix["markets"]["only-US"] == ["US"]
+
+
+def test_matrix_paging_and_missing():
+    """Test paging objects are read from their items and missing items or results are skipped"""
+    matrix = availability_matrix({
+        "US": {"items": [{"id": "a"}, None], "total": 2},
+        "GB": [{"id": "a"}, {"name": "no id"}, None],
+        "DE": None,
+        "JP": {"error": {"status": 429}},
+    })
+
+    assert matrix == {"items": {"a": {"id": "a"}}, "markets": {"a": ["GB", "US"]}}
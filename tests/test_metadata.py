@@ -0,0 +1,192 @@
+"""
+Tests for the metadata.py file
+"""
+from spotify_web_api.spotify_api import BASE_URL
+from spotify_web_api.metadata import MetadataRegistry
+from spotify_web_api.transport import FakeTransport
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import pytest
+
+
+def categories(params):
+    offset, limit = int(params["offset"]), int(params["limit"])
+    ids = [f"cat{i}" for i in range(120)]
+    return {"categories": {"items": [{"id": i} for i in ids[offset:offset + limit]], "total": len(ids)}}
+
+
+@pytest.fixture
+def transport():
+    return FakeTransport({
+        f"{BASE_URL}browse/categories": categories,
+        f"{BASE_URL}browse/categories/cat110": {"id": "cat110"},
+        f"{BASE_URL}recommendations/available-genre-seeds": {"genres": ["metal", "sad"]},
+    })
+
+
+def test_all_categories(transport, make_spy, num_gets):
+    """Test every page of categories is fetched"""
+    spy = make_spy(transport, metadata=MetadataRegistry())
+    assert len(spy.get_all_categories()) == 120
+    assert num_gets(transport) == 3
+
+
+def test_validation(transport, make_spy, num_gets):
+    """Test categories are checked against the fetched list which is only fetched once"""
+    spy = make_spy(transport, metadata=MetadataRegistry())
+
+    assert spy.get_category("cat110") == {"id": "cat110"}
+    with pytest.raises(ValueError):
+        spy.get_category("rock")
+    with pytest.raises(ValueError):
+        spy.get_category_playlists("rock")
+
+    # 3 pages of categories and the category itself
+    assert num_gets(transport) == 4
+
+
+def test_mixed_case_category(transport, make_spy):
+    """Test category ids are checked and sent exactly as given"""
+    category = "0JQ5DAqbMKFEC4WFtoNRpw"
+    transport.add(f"{BASE_URL}browse/categories", {"categories": {"items": [{"id": category}], "total": 1}})
+    transport.add(f"{BASE_URL}browse/categories/{category}", {"id": category})
+    transport.add(f"{BASE_URL}browse/categories/{category}/playlists", {"playlists": {"items": [{"id": "pl"}]}})
+    spy = make_spy(transport, metadata=MetadataRegistry())
+
+    assert spy.get_category(category) == {"id": category}
+    assert spy.get_category_playlists(category) == [{"id": "pl"}]
+    assert spy.fan_out_markets("get_category_playlists", ["US", "GB"], category=category)["GB"] == [{"id": "pl"}]
+    with pytest.raises(ValueError):
+        spy.get_category(category.lower())
+
+
+def test_genres(transport, make_spy):
+    """Test genre seeds are validated"""
+    registry = MetadataRegistry()
+    spy = make_spy(transport, metadata=registry)
+
+    assert registry.is_genre(spy, "metal")
+    with pytest.raises(ValueError):
+        spy.get_recommendations([], [], ["not a genre"])
+
+
+def test_genres_normalized(transport, make_spy):
+    """Test genres are lower cased and empty ones are skipped before they're checked"""
+    transport.add(f"{BASE_URL}recommendations", lambda params: {"tracks": [{"id": params["seed_genres"]}]})
+    spy = make_spy(transport, metadata=MetadataRegistry())
+
+    assert spy.get_recommendations("artist", [], "") == [{"id": ""}]
+    assert spy.get_recommendations([], [], ["Metal", "", "SAD"]) == [{"id": "metal,sad"}]
+
+
+def test_snapshot(transport, tmp_path, make_spy, num_gets):
+    """Test a new registry loads the lists from disk without any calls"""
+    path = str(tmp_path / "metadata.json")
+    spy = make_spy(transport, metadata=MetadataRegistry(path))
+    spy._metadata.category_ids(spy)
+    spy._metadata.genre_seeds(spy)
+
+    transport = FakeTransport()
+    registry = MetadataRegistry(path)
+    spy = make_spy(transport, metadata=registry)
+    assert registry.is_category(spy, "cat0")
+    assert registry.is_genre(spy, "sad")
+    assert num_gets(transport) == 0
+
+
+def test_ttl(transport, make_spy, num_gets):
+    """Test the lists are fetched again once they're stale"""
+    registry = MetadataRegistry(ttl=0)
+    spy = make_spy(transport, metadata=registry)
+    registry.genre_seeds(spy)
+    registry.genre_seeds(spy)
+    assert num_gets(transport) == 2
+
+
+def test_fetch_failed(make_spy):
+    """Test nothing is rejected when the lists can't be fetched"""
+    registry = MetadataRegistry()
+    spy = make_spy(FakeTransport(), metadata=registry)
+    assert registry.is_category(spy, "anything")
+
+
+def test_partial_categories(make_spy):
+    """Test a list that errors after the first page isn't kept"""
+    def throttled(params):
+        if int(params["offset"]) > 0:
+            return {"error": {"status": 429, "message": "API rate limit exceeded"}}
+        return categories(params)
+
+    registry = MetadataRegistry()
+    spy = make_spy(FakeTransport({f"{BASE_URL}browse/categories": throttled}), metadata=registry)
+
+    with pytest.raises(RuntimeError):
+        spy.get_all_categories()
+    assert registry.category_ids(spy) == set()
+    assert registry.is_category(spy, "cat75")
+
+
+def test_failure_remembered(make_spy, num_gets):
+    """Test a list that couldn't be fetched isn't asked for again on every call until the retry time is up"""
+    transport = FakeTransport({f"{BASE_URL}recommendations": {"tracks": []}})
+    spy = make_spy(transport, metadata=MetadataRegistry())
+
+    for _ in range(3):
+        spy.get_recommendations([], [], ["metal"])
+
+    # 1 for the genre seeds that 404 and 1 for each call
+    assert num_gets(transport) == 4
+
+    registry = MetadataRegistry(retry=0)
+    spy = make_spy(transport, metadata=registry)
+    registry.genre_seeds(spy)
+    registry.genre_seeds(spy)
+    assert num_gets(transport) == 6
+
+
+def test_fetch_outside_lock(make_spy, num_gets):
+    """Test different lists are fetched at the same time and the same list is only fetched once"""
+    barrier = threading.Barrier(2, timeout=2)
+
+    def seeds(params):
+        barrier.wait()
+        return {"genres": ["metal"]}
+
+    def page(params):
+        if params["offset"] == 0:
+            barrier.wait()
+        return categories(params)
+
+    transport = FakeTransport({
+        f"{BASE_URL}browse/categories": page,
+        f"{BASE_URL}recommendations/available-genre-seeds": seeds,
+    })
+    registry = MetadataRegistry()
+    spy = make_spy(transport, metadata=registry)
+
+    # The barrier only opens if the categories and genres are being fetched at the same time
+    with ThreadPoolExecutor(4) as pool:
+        genres = [pool.submit(registry.genre_seeds, spy) for _ in range(3)]
+        ids = pool.submit(registry.category_ids, spy)
+
+        assert all(g.result() == {"metal"} for g in genres)
+        assert len(ids.result()) == 120
+
+    # 1 request for the genres and 3 pages of categories
+    assert num_gets(transport) == 4
+
+
+def test_fan_out_checks_category_once(transport, make_spy, num_gets):
+    """Test a category fanned out over several markets is checked against one list instead of one per market"""
+    transport.add(f"{BASE_URL}browse/categories/cat0/playlists", {"playlists": {"items": [{"id": "pl"}]}})
+    spy = make_spy(transport, metadata=MetadataRegistry())
+
+    results = spy.fan_out_markets("get_category_playlists", ["US", "GB", "DE"], category="cat0")
+    assert results == {market: [{"id": "pl"}] for market in ["US", "GB", "DE"]}
+
+    # 3 pages of categories for every country and a request per market
+    assert num_gets(transport) == 6
+    assert all("country" not in c[2] for c in transport.calls if c[1] == f"{BASE_URL}browse/categories")
+
+    with pytest.raises(ValueError):
+        spy.fan_out_markets("get_category_playlists", ["US", "GB"], category="rock")
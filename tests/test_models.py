@@ -0,0 +1,89 @@
+"""
+Tests for the models.py file
+"""
+from spotify_web_api.spotify_api import BASE_URL
+from spotify_web_api.models import Track, Album, AudioFeatures, PlaylistTrack, typed
+from spotify_web_api.transport import FakeTransport
+import pytest
+
+
+@pytest.fixture
+def track_json():
+    return {
+        "id": "6e32JnkTy46WgO1waYifJo",
+        "name": "Beauty in Falling Leaves",
+        "duration_ms": 460000,
+        "available_markets": ["US", "GB"] * 50,
+        "album": {
+            "id": "album",
+            "name": "Time Will Die and Love Will Bury It",
+            "available_markets": ["US"],
+            "images": [{"url": "https://i.scdn.co/image/abc", "height": 640, "width": 640}],
+        },
+        "artists": [{"id": "3uHCTHxtg3IVAvhyrYsZvI", "name": "Rolo Tomassi"}],
+    }
+
+
+def test_slots(track_json):
+    """Test models have no __dict__ and drop fields that aren't kept"""
+    track = Track(track_json)
+    assert not hasattr(track, "__dict__")
+    assert "available_markets" not in track.to_dict()
+    with pytest.raises(AttributeError):
+        track.available_markets = []
+
+
+def test_lazy(track_json):
+    """Test nested objects are kept raw until they're accessed"""
+    track = Track(track_json)
+    assert isinstance(track._album, dict)
+    track.to_dict()
+    assert isinstance(track._album, dict)
+
+    assert track.album.name == "Time Will Die and Love Will Bury It"
+    assert isinstance(track._album, Album)
+    assert track.album is track.album
+    assert track.album.images[0].width == 640
+    assert track.artists[0].name == "Rolo Tomassi"
+
+
+def test_to_dict(track_json):
+    """Test to_dict gives back the same kept fields whether or not the nested objects were decoded"""
+    before = Track(track_json).to_dict()
+
+    track = Track(track_json)
+    track.album.images
+    track.artists
+    after = track.to_dict()
+
+    assert before == after
+    assert before["name"] == "Beauty in Falling Leaves"
+    assert "available_markets" not in before["album"]
+    assert before["album"] is not track_json["album"]
+    assert after["album"]["images"] == track_json["album"]["images"]
+
+
+def test_parse():
+    """Test parsing lists with missing items"""
+    features = AudioFeatures.parse([{"id": "a", "tempo": 120.0}, None])
+    assert features[0].tempo == 120.0
+    assert features[1] is None
+    assert AudioFeatures.parse(None) is None
+
+
+def test_typed(track_json, make_spy):
+    """Test the wrapped client returns models from the getters and passes everything else through"""
+    transport = FakeTransport({
+        f"{BASE_URL}tracks": {"tracks": [track_json]},
+        f"{BASE_URL}playlists/pl": {"tracks": {"total": 1}},
+        f"{BASE_URL}playlists/pl/tracks": {"items": [{"added_at": "2019-01-01T00:00:00Z", "track": track_json}]},
+    })
+    spy = typed(make_spy(transport))
+
+    assert spy.get_tracks(["6e32JnkTy46WgO1waYifJo"], track_id=True)[0].album.id == "album"
+
+    playlist_tracks = spy.get_playlist_tracks("pl")
+    assert isinstance(playlist_tracks[0], PlaylistTrack)
+    assert playlist_tracks[0].track.artists[0].id == "3uHCTHxtg3IVAvhyrYsZvI"
+
+    assert not spy.token_expired()
@@ -0,0 +1,116 @@
+"""
+Tests for the playlist_sync.py file
+"""
+from spotify_web_api.spotify_api import BASE_URL
+from spotify_web_api.playlist_sync import PlaylistStore, diff_tracks, track_key
+from spotify_web_api.transport import FakeTransport
+import pytest
+
+
+def item(key, local=False):
+    if local:
+        return {"track": {"id": None, "uri": f"spotify:local:{key}"}}
+    return {"track": {"id": key, "uri": f"spotify:track:{key}"}}
+
+
+class Playlist:
+    """Fake playlist whose tracks can be changed between syncs"""
+    def __init__(self, snapshot_id, keys):
+        self.snapshot_id = snapshot_id
+        self.keys = keys
+
+    def info(self, params):
+        return {"snapshot_id": self.snapshot_id, "tracks": {"total": len(self.keys)}}
+
+    def tracks(self, params):
+        offset = int(params["offset"])
+        return {"items": [item(k) for k in self.keys[offset:offset + 100]]}
+
+
+@pytest.fixture
+def playlist():
+    return Playlist("s1", [f"t{i}" for i in range(150)])
+
+@pytest.fixture
+def transport(playlist):
+    return FakeTransport({
+        f"{BASE_URL}playlists/pl": playlist.info,
+        f"{BASE_URL}playlists/pl/tracks": playlist.tracks,
+    })
+
+@pytest.fixture
+def spy(transport, make_spy):
+    return make_spy(transport)
+
+
+def test_track_key():
+    """Test local tracks fall back to the uri"""
+    assert track_key(item("a")) == "a"
+    assert track_key(item("a", local=True)) == "spotify:local:a"
+    assert track_key({"track": None}) is None
+
+
+def test_diff_duplicates():
+    """Test a track added a 2nd time is an addition and removing one copy only removes one"""
+    added, removed = diff_tracks(["a", "b"], [item("a"), item("b"), item("a")])
+    assert [track_key(t) for t in added] == ["a"]
+    assert removed == []
+
+    added, removed = diff_tracks(["a", "a", "b"], [item("a"), item("b")])
+    assert added == []
+    assert removed == ["a"]
+
+
+def test_diff_local_tracks():
+    """Test local tracks are matched on their uri"""
+    old = ["a", "spotify:local:x"]
+    added, removed = diff_tracks(old, [item("a"), item("x", local=True), item("y", local=True)])
+    assert [track_key(t) for t in added] == ["spotify:local:y"]
+    assert removed == []
+
+    added, removed = diff_tracks(old, [item("a")])
+    assert removed == ["spotify:local:x"]
+
+
+def test_store_round_trip(tmp_path):
+    """Test a saved store is loaded back the same"""
+    path = str(tmp_path / "playlists.json")
+    store = PlaylistStore(path)
+    store.put("pl", "s1", ["a", "a", "spotify:local:x"])
+    store.put("gone", "s1", [])
+    store.remove("gone")
+    store.save()
+
+    loaded = PlaylistStore(path)
+    assert len(loaded) == 1
+    assert "gone" not in loaded
+    assert loaded.get("pl") == {"snapshot_id": "s1", "tracks": ["a", "a", "spotify:local:x"]}
+
+
+def test_sync(spy, transport, playlist, num_gets):
+    """Test a new playlist is fully pulled, an unchanged one sends no track requests and a changed one is diffed"""
+    store = PlaylistStore()
+
+    changes = spy.sync_playlists("pl", store)
+    assert len(changes["pl"]["added"]) == 150
+    assert changes["pl"]["removed"] == []
+    # snapshot and 2 pages of tracks
+    assert num_gets(transport) == 3
+
+    assert spy.sync_playlists(["pl"], store) == {}
+    # Only the snapshot is asked for
+    assert num_gets(transport) == 4
+    assert transport.calls[-1][1] == f"{BASE_URL}playlists/pl"
+
+    playlist.snapshot_id = "s2"
+    playlist.keys = playlist.keys[1:] + ["new"]
+    changes = spy.sync_playlists(["pl"], store)
+    assert [track_key(t) for t in changes["pl"]["added"]] == ["new"]
+    assert changes["pl"]["removed"] == ["t0"]
+    assert store.get("pl")["snapshot_id"] == "s2"
+
+
+def test_sync_not_found(spy, capsys):
+    """Test a playlist that can't be found is skipped"""
+    assert spy.sync_playlists(["missing"]) == {}
+    assert "not found" in capsys.readouterr().out
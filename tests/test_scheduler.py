@@ -0,0 +1,79 @@
+"""
+Tests for the scheduler.py file
+"""
+from spotify_web_api.spotify_api import BASE_URL
+from spotify_web_api.scheduler import Scheduler, priority, current_priority
+from spotify_web_api.transport import FakeTransport
+import threading
+import time
+import pytest
+
+
+def test_priority_context():
+    """Test the priority class is set and reset by the context manager"""
+    assert current_priority() == "normal"
+    with priority("bulk"):
+        assert current_priority() == "bulk"
+    assert current_priority() == "normal"
+
+
+def test_bad_class():
+    """Test an unknown priority class raises"""
+    with pytest.raises(ValueError):
+        Scheduler().acquire("urgent")
+
+
+def test_rate():
+    """Test requests are spaced out by the rate"""
+    scheduler = Scheduler(rate=20)
+    start = time.monotonic()
+    for _ in range(5):
+        scheduler.acquire()
+
+    assert time.monotonic() - start >= 4 / 20
+
+
+def test_interactive_first_bulk_not_starved():
+    """Test interactive requests jump ahead of queued bulk ones but bulk still gets a share"""
+    scheduler = Scheduler(rate=50)
+    order = []
+
+    def run(name):
+        scheduler.acquire(name)
+        order.append(name)
+
+    # Use up the first slot so everyone else has to queue
+    scheduler.acquire("bulk")
+
+    threads = [threading.Thread(target=run, args=("bulk",)) for _ in range(10)]
+    threads += [threading.Thread(target=run, args=("interactive",)) for _ in range(10)]
+    for t in threads:
+        t.start()
+        time.sleep(.001)
+    for t in threads:
+        t.join()
+
+    # Interactive gets 8x the share of bulk so most of the first slots go to it
+    assert len([o for o in order[:12] if o == "interactive"]) >= 8
+    assert 0 < len([o for o in order[:12] if o == "bulk"])
+
+    stats = scheduler.stats()
+    assert stats["interactive"]["granted"] == 10
+    assert stats["bulk"]["granted"] == 11
+    assert stats["bulk"]["queued"] == 0
+    assert stats["bulk"]["max_wait"] > stats["interactive"]["avg_wait"]
+
+
+def test_spotify_scheduler(make_spy):
+    """Test queries go through the scheduler with the priority of the caller"""
+    transport = FakeTransport({f"{BASE_URL}recommendations/available-genre-seeds": {"genres": ["metal"]}})
+    scheduler = Scheduler(rate=100)
+    spy = make_spy(transport, scheduler=scheduler)
+
+    with priority("interactive"):
+        assert spy.get_genre_seeds() == ["metal"]
+    spy.get_genre_seeds()
+
+    stats = scheduler.stats()
+    assert stats["interactive"]["granted"] == 1
+    assert stats["normal"]["granted"] == 1
@@ -0,0 +1,56 @@
+"""
+Tests for batched searching in the spotify_api.py file
+"""
+from spotify_web_api.spotify_api import BASE_URL
+from spotify_web_api.transport import FakeTransport
+import pytest
+
+
+def search(params):
+    results = {}
+    for search_type in params["type"].split(","):
+        results[f"{search_type}s"] = {"items": [{"id": f"{params['q']}-{search_type}"}]}
+    return results
+
+
+@pytest.fixture
+def transport():
+    return FakeTransport({f"{BASE_URL}search": search})
+
+@pytest.fixture
+def spy(transport, make_spy):
+    return make_spy(transport)
+
+
+def test_batch_search(spy, transport):
+    """Test several types are searched in one request and grouped by type"""
+    results = spy.batch_search("converge", ("artist", "album"))
+
+    assert results == {"artist": [{"id": "converge-artist"}], "album": [{"id": "converge-album"}]}
+    assert transport.calls[-1][2]["type"] == "artist,album"
+
+
+def test_batch_search_generator(spy, transport):
+    """Test a generator or comma separated str of types gives the same results as a list"""
+    expected = {"artist": [{"id": "converge-artist"}], "album": [{"id": "converge-album"}]}
+
+    assert spy.batch_search("converge", (t for t in ["artist", "album"])) == expected
+    assert spy.batch_search("converge", "artist,album") == expected
+
+
+def test_invalid_type(spy, num_gets, transport):
+    """Test invalid types don't send a request"""
+    assert spy.search("converge", None) is None
+    assert spy.search("converge", ["artist", "song"]) is None
+    assert num_gets(transport) == 0
+
+
+def test_resolve_ids(spy, transport, num_gets):
+    """Test each distinct name is searched once for all the types"""
+    resolved = spy.resolve_ids(["converge", "jane doe", "converge"], ["artist", "album"])
+
+    assert resolved[0] == resolved[2] == {"artist": "converge-artist", "album": "converge-album"}
+    assert resolved[1]["album"] == "jane doe-album"
+
+    assert num_gets(transport) == 2
+    assert all(call[2]["type"] == "artist,album" and call[2]["limit"] == 1 for call in transport.calls[1:])
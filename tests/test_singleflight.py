@@ -0,0 +1,137 @@
+"""
+Tests for the singleflight.py file
+"""
+from spotify_web_api.spotify_api import BASE_URL
+from spotify_web_api.singleflight import SingleFlight, make_key
+from spotify_web_api.transport import FakeTransport
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
+import pytest
+
+
+@pytest.fixture
+def transport():
+    def seeds(params):
+        time.sleep(.2)
+        return {"genres": ["metal", "sad"]}
+
+    return FakeTransport({f"{BASE_URL}recommendations/available-genre-seeds": seeds})
+
+@pytest.fixture
+def spy(transport, make_spy):
+    return make_spy(transport)
+
+
+def test_make_key():
+    """Test params are normalized"""
+    assert make_key("artists", {"a": 1, "b": 2}) == make_key("artists", {"b": "2", "a": "1"})
+    assert make_key("artists", {"a": 1}) != make_key("albums", {"a": 1})
+
+
+def test_threads_share_request(spy, transport, num_gets):
+    """Test identical queries made at the same time by different threads only send one request"""
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: spy.get_genre_seeds(), range(8)))
+
+    assert all(r == ["metal", "sad"] for r in results)
+    assert num_gets(transport) == 1
+
+
+def test_sequential_not_shared(spy, transport, num_gets):
+    """Test it isn't a cache. Once finished the next query goes out again"""
+    spy.get_genre_seeds()
+    spy.get_genre_seeds()
+    assert num_gets(transport) == 2
+
+
+def test_dedupe_off(transport, make_spy, num_gets):
+    """Test every thread sends its own request when turned off"""
+    spy = make_spy(transport, dedupe=False)
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda _: spy.get_genre_seeds(), range(4)))
+
+    assert num_gets(transport) == 4
+
+
+def test_async_share_request(spy, transport, num_gets):
+    """Test coroutines share a request with each other and with a thread"""
+    async def run():
+        thread = threading.Thread(target=spy.query, args=("recommendations/available-genre-seeds", {}))
+        thread.start()
+        time.sleep(.05)
+        queries = [spy.query_async("recommendations/available-genre-seeds", {}) for _ in range(5)]
+        results = await asyncio.gather(*queries)
+        thread.join()
+        return results
+
+    results = asyncio.run(run())
+    assert all(r == {"genres": ["metal", "sad"]} for r in results)
+    assert num_gets(transport) == 1
+
+
+def test_error_shared():
+    """Test waiting callers get the error raised by the call"""
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(.1)
+        raise ValueError("failed")
+
+    def join():
+        started.wait()
+        return flight.do("key", lambda: "not called")
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, "key", fail)
+        waiter = pool.submit(join)
+
+        with pytest.raises(ValueError):
+            leader.result()
+        with pytest.raises(ValueError):
+            waiter.result()
+
+    assert flight.in_flight() == 0
+
+
+def test_results_not_shared(spy):
+    """Test callers sharing a request each get their own copy of the result"""
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: spy.query("recommendations/available-genre-seeds", {}), range(4)))
+
+    results[0]["genres"].append("jazz")
+    assert all(r == {"genres": ["metal", "sad"]} for r in results[1:])
+    assert len({id(r) for r in results}) == 4
+
+
+def test_async_leader_cancelled():
+    """Test cancelling the coroutine that started a call doesn't cancel it for the callers waiting on it"""
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(2)
+        return b"done"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do_async("key", slow))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+
+        with ThreadPoolExecutor(1) as pool:
+            waiter = pool.submit(flight.do, "key", lambda: b"not called")
+            time.sleep(.05)
+
+            leader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+
+            release.set()
+            return waiter.result(timeout=2)
+
+    assert asyncio.run(run()) == b"done"
+    assert flight.in_flight() == 0
@@ -2,6 +2,7 @@
 Tests for the spotify_api.py file
 """
 from spotify_web_api.spotify_api import Spotify
+from spotify_web_api.playlist_sync import PlaylistStore
 import os
 import pytest
 
@@ -38,6 +39,10 @@ def track_ids():
 def category():
     return 'rock'
 
+@pytest.fixture
+def playlist_id():
+    return '37i9dQZF1DXcBWIGoYBM5M'
+
 
 #################################################################
 ######################### General API ###########################
@@ -80,6 +85,20 @@ def test_search(spy):
     assert len(spy.search("time will die and love will bury it", "album")['albums']['items']) > 0
 
 
+def test_batch_search(spy):
+    """Test searching for several types in one request"""
+    results = spy.batch_search("converge", ["artist", "album", "track"])
+    assert set(results.keys()) == {"artist", "album", "track"}
+    assert all(len(items) > 0 for items in results.values())
+
+
+def test_resolve_ids(spy, artists, artist_ids, albums, album_ids):
+    """Test resolving a mixed list of names to ids"""
+    resolved = spy.resolve_ids([artists[1], albums[1]], ["artist", "album"])
+    assert resolved[0]["artist"] == artist_ids[1]
+    assert resolved[1]["album"] == album_ids[1]
+
+
 #################################################################
 ##########################  Browse API ##########################
 #################################################################
@@ -157,6 +176,16 @@ def test_get_top_tracks(spy, artists, artist_ids):
     assert len(spy.get_top_tracks(artist_ids[0], "US", artist_id=True)) > 0
 
 
+def test_get_top_tracks_markets(spy, artists):
+    """Test getting the top tracks for an artist over several markets"""
+    markets = ["US", "GB", "DE"]
+    assert list(spy.get_top_tracks_markets(artists[0], markets).keys()) == markets
+
+    matrix = spy.get_top_tracks_markets(artists[0], markets, matrix=True)
+    assert set(matrix['items']) == set(matrix['markets'])
+    assert all(set(found) <= set(markets) for found in matrix['markets'].values())
+
+
 def test_get_related_artists(spy, artists, artist_ids):
     """Test getting the related artist for an artist"""
     # From name
@@ -227,3 +256,21 @@ def test_get_audio_analysis(spy, tracks, track_ids):
     assert "bars" in spy.get_audio_analysis(track_ids[0], track_id=True)
 
 
+#################################################################
+########################  Playlist API ##########################
+#################################################################
+
+def test_get_playlist_tracks(spy, playlist_id):
+    """Test getting all the tracks in a playlist"""
+    assert len(spy.get_playlist_tracks(playlist_id)) == spy.get_playlist(playlist_id)['tracks']['total']
+
+
+def test_sync_playlists(spy, playlist_id):
+    """Test the first sync pulls everything and a second one skips the unchanged playlist"""
+    store = PlaylistStore()
+
+    changes = spy.sync_playlists(playlist_id, store)
+    assert len(changes[playlist_id]['added']) > 0
+    assert changes[playlist_id]['removed'] == []
+
+    assert spy.sync_playlists(playlist_id, store) == {}
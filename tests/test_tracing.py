@@ -0,0 +1,70 @@
+"""
+Tests for the tracing.py file
+"""
+from spotify_web_api.spotify_api import BASE_URL
+from spotify_web_api.tracing import Tracer
+from spotify_web_api.transport import FakeTransport
+import json
+import pytest
+
+
+@pytest.fixture
+def tracer():
+    return Tracer()
+
+@pytest.fixture
+def spy(tracer, make_spy):
+    transport = FakeTransport({
+        f"{BASE_URL}search": {"artists": {"items": [{"id": "7kHzfxMLtVHHb523s43rY1"}]}},
+        f"{BASE_URL}artists/7kHzfxMLtVHHb523s43rY1/albums": {"items": [{"id": "album"}]},
+    })
+    return make_spy(transport, tracer=tracer)
+
+
+def test_nested_spans(spy, tracer):
+    """Test a public method records the name resolution and each part of its queries under it"""
+    tracer.clear()
+    assert spy.get_artist_albums("converge") == [{"id": "album"}]
+
+    spans = {s["id"]: s for s in tracer.spans}
+    top = [s for s in spans.values() if s["parent"] is None]
+    assert [s["name"] for s in top] == ["get_artist_albums"]
+
+    def path(span):
+        names = []
+        while span is not None:
+            names.append(span["name"])
+            span = spans.get(span["parent"])
+        return list(reversed(names))
+
+    paths = [path(s) for s in spans.values()]
+    assert ["get_artist_albums", "get_id", "get_ids", "search", "query", "network"] in paths
+    assert ["get_artist_albums", "query", "decode"] in paths
+
+
+def test_no_tracer(make_spy):
+    """Test nothing breaks without a tracer"""
+    spy = make_spy()
+    spy.query("artists", {})
+
+
+def test_token_span(tracer, make_spy):
+    """Test the token request is recorded"""
+    make_spy(tracer=tracer)
+    assert tracer.summary()["get_access_token"]["count"] == 1
+
+
+def test_export(spy, tracer, tmp_path):
+    """Test exporting in both formats"""
+    spy.get_artist_albums("converge")
+
+    trace_path = tmp_path / "trace.json"
+    tracer.export_chrome(str(trace_path))
+    events = json.load(open(trace_path))["traceEvents"]
+    assert len(events) == len(tracer.spans)
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)
+
+    lines_path = tmp_path / "trace.jsonl"
+    tracer.export_jsonl(str(lines_path))
+    lines = [json.loads(line) for line in open(lines_path)]
+    assert [line["name"] for line in lines] == [s["name"] for s in tracer.spans]
@@ -0,0 +1,48 @@
+"""
+Tests for the transport.py file
+"""
+from spotify_web_api.spotify_api import BASE_URL, TOKEN_URL
+from spotify_web_api.transport import FakeTransport, HTTPXTransport, Response
+import pytest
+
+
+@pytest.fixture
+def transport():
+    return FakeTransport()
+
+@pytest.fixture
+def spy(transport, make_spy):
+    return make_spy(transport)
+
+
+def test_response():
+    """Test the response decodes its content"""
+    r = Response(200, b'{"a": 1}')
+    assert r.text == '{"a": 1}'
+    assert r.json() == {"a": 1}
+
+
+def test_fake_token(spy, transport):
+    """Test the access token is requested through the transport"""
+    assert transport.calls[0][:2] == ("POST", TOKEN_URL)
+    assert spy._access_token['access_token'] == FakeTransport.TOKEN['access_token']
+
+
+def test_fake_query(spy, transport):
+    """Test queries are sent through the transport"""
+    transport.add(f"{BASE_URL}artists", lambda params: {"artists": [{"id": i} for i in params['ids'].split(",")]})
+
+    assert spy.get_artists(["a", "b"], artist_id=True) == [{"id": "a"}, {"id": "b"}]
+    assert transport.calls[-1] == ("GET", f"{BASE_URL}artists", {"ids": "a,b"})
+
+
+def test_fake_not_found(spy):
+    """Test an unregistered url returns an error instead of touching the network"""
+    assert spy.query("artists", {})['error']['status'] == 404
+
+
+def test_httpx_transport():
+    """Test the httpx transport can be built when httpx is installed"""
+    pytest.importorskip("httpx")
+    pytest.importorskip("h2")
+    HTTPXTransport().close()